@@ -0,0 +1,229 @@
+"""
+Modo lote / multi-región: varios pares fleet + disponibilidad en un solo procesamiento.
+
+Los pares llegan en un zip (o un directorio, desde la línea de comandos):
+
+- una carpeta por región con sus dos planillas:  SP/fleet-moviles.xlsx, SP/disponibilidad.xlsx
+- o en la raíz, con la región en el nombre:      SP-fleet-moviles.xlsx, SP-disponibilidad.xlsx
+
+Cuál es cuál se decide por el nombre (fleet/frota/flota vs. disp...). Cada par se reconcilia
+por separado (en paralelo, con el template ya parseado) y el resultado es un libro con una
+hoja por región o un zip con un archivo por región, más el `changes_summary` sumado.
+
+    python batch.py regiones.zip --out actualizacion.xlsx
+    python batch.py carpeta_regiones/ --zip --workers 4
+"""
+import io
+import os
+import re
+import zipfile
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from pipeline import PipelineError, build_update, parse_disponibilidad, parse_fleet
+from template_registry import TemplateLayout
+from writers import DEFAULT_BACKEND, format_info, sheet_names, write_output, write_sheets, write_zip
+
+BUNDLES = ("sheets", "zip")
+_FLEET_NAME = re.compile(r"fleet[-_ ]?moviles|fleet|frota|flota", re.IGNORECASE)
+_DISP_NAME = re.compile(r"disponibilidade?|disponibilidad|disp", re.IGNORECASE)
+
+Pair = Tuple[bytes, bytes]
+
+
+# ---------- Entrada ----------
+def _role(path: str) -> Tuple[Optional[str], str]:
+    """("fleet" | "disp" | None, región) según la ruta del archivo dentro del lote."""
+    folder, name = os.path.split(path.replace("\\", "/").strip("/"))
+    stem = os.path.splitext(name)[0]
+    for role, pattern in (("disp", _DISP_NAME), ("fleet", _FLEET_NAME)):
+        if pattern.search(stem):
+            region = os.path.basename(folder) or pattern.sub("", stem).strip(" -_.")
+            return role, region
+    return None, ""
+
+
+def _usable(path: str) -> bool:
+    name = os.path.basename(path)
+    return (name.lower().endswith(".xlsx") and not name.startswith(("~$", "."))
+            and not path.startswith("__MACOSX/"))
+
+
+def read_pairs(files: Dict[str, bytes]) -> Dict[str, Pair]:
+    """
+    Agrupa {ruta: contenido} en {región: (fleet, disponibilidad)}, en orden de región. El
+    contenido no se inspecciona: con {ruta: ruta} sirve para agrupar rutas.
+    """
+    found: Dict[str, Dict[str, bytes]] = {}
+    for path, data in files.items():
+        if not _usable(path):
+            continue
+        role, region = _role(path)
+        if role is None:
+            raise PipelineError(f"Não sei se {path} é a planilha de frota ou de disponibilidade.")
+        if not region:
+            raise PipelineError(f"Não encontrei a região de {path} (use uma pasta por região).")
+        if role in found.setdefault(region, {}):
+            raise PipelineError(f"Região {region}: mais de uma planilha de {'frota' if role == 'fleet' else 'disponibilidade'}.")
+        found[region][role] = data
+    if not found:
+        raise PipelineError("O lote não tem planilhas .xlsx.")
+    pairs = {}
+    for region in sorted(found):
+        region_files = found[region]
+        if "fleet" not in region_files or "disp" not in region_files:
+            missing = "frota" if "fleet" not in region_files else "disponibilidade"
+            raise PipelineError(f"Região {region}: falta a planilha de {missing}.")
+        pairs[region] = (region_files["fleet"], region_files["disp"])
+    return pairs
+
+
+def read_zip(data, max_member_bytes: Optional[int] = None, max_total_bytes: Optional[int] = None,
+             max_members: Optional[int] = None) -> Dict[str, Pair]:
+    """
+    Pares de un zip (bytes o archivo binario). Topes, por los tamaños declarados y antes de
+    descomprimir nada: `max_member_bytes` por planilla, `max_total_bytes` para la suma de las
+    planillas y `max_members` para su cantidad (413 si se superan).
+    """
+    try:
+        with zipfile.ZipFile(data if hasattr(data, "seek") else io.BytesIO(data)) as zf:
+            members = [info for info in zf.infolist() if not info.is_dir() and _usable(info.filename)]
+            if max_members is not None and len(members) > max_members:
+                raise PipelineError(f"O lote tem {len(members)} planilhas (máximo {max_members}).", status_code=413)
+            for info in members:
+                if max_member_bytes is not None and info.file_size > max_member_bytes:
+                    raise PipelineError(f"{info.filename}: arquivo muito grande "
+                                        f"(máximo {max_member_bytes / (1024 * 1024):g} MB).", status_code=413)
+            total = sum(info.file_size for info in members)
+            if max_total_bytes is not None and total > max_total_bytes:
+                raise PipelineError(f"O lote descompactado é muito grande "
+                                    f"(máximo {max_total_bytes / (1024 * 1024):g} MB).", status_code=413)
+            files = {info.filename: zf.read(info) for info in members}
+    except zipfile.BadZipFile:
+        raise PipelineError("O lote deve ser um arquivo .zip.")
+    return read_pairs(files)
+
+
+def read_directory(path: str) -> Dict[str, Pair]:
+    files = {}
+    for folder, _, names in os.walk(path):
+        for name in names:
+            full = os.path.join(folder, name)
+            rel = os.path.relpath(full, path)
+            if _usable(rel):
+                with open(full, "rb") as f:
+                    files[rel] = f.read()
+    return read_pairs(files)
+
+
+# ---------- Procesamiento ----------
+def reconcile_pair(fleet_source, disp_source, layout: TemplateLayout) -> Tuple[pd.DataFrame, Dict[str, int], List[dict]]:
+    """Lectura + reglas de un par (sin escribir). Devuelve (output_df, changes_summary, table_data)."""
+    return build_update(parse_fleet(fleet_source), parse_disponibilidad(disp_source), layout)
+
+
+def aggregate(summaries: Iterable[Dict[str, int]]) -> Dict[str, int]:
+    """Suma clave a clave de los `changes_summary` de cada región."""
+    total: Dict[str, int] = {}
+    for summary in summaries:
+        for key, value in summary.items():
+            total[key] = total.get(key, 0) + value
+    return total
+
+
+def write_batch(outputs: Dict[str, pd.DataFrame], sheet_name: str, backend: str = DEFAULT_BACKEND,
+                bundle: str = "sheets") -> io.BytesIO:
+    """Libro con una hoja por región (`sheets`) o zip con un archivo por región (`zip`)."""
+    if bundle == "zip":
+        extension = format_info(backend)["extension"]
+        names = [re.sub(r"[^\w.-]+", "_", region) for region in outputs]
+        return write_zip({f"{name}.{extension}": write_output(df, sheet_name, backend)
+                          for name, df in zip(names, outputs.values())})
+    check_bundle(backend, bundle)
+    return write_sheets(dict(zip(sheet_names(outputs), outputs.values())), backend)
+
+
+def check_bundle(backend: str, bundle: str):
+    """Valida la combinación antes de procesar (CSV y Parquet no admiten varias hojas)."""
+    if bundle not in BUNDLES:
+        raise PipelineError(f"Formato de lote desconhecido: {bundle}")
+    if backend in ("csv", "parquet") and bundle != "zip":
+        raise PipelineError(f"{backend.upper()} só está disponível com um arquivo por região (zip).")
+
+
+def batch_format(backend: str, bundle: str) -> str:
+    """Clave de `writers.format_info` del archivo que produce el lote."""
+    return "zip" if bundle == "zip" else backend
+
+
+def run_batch(pairs: Dict[str, Pair], layout: TemplateLayout, backend: str = DEFAULT_BACKEND,
+              bundle: str = "sheets", executor=None) -> dict:
+    """Todas las regiones (en paralelo si se pasa un `executor`) y el archivo combinado."""
+    check_bundle(backend, bundle)
+    regions = list(pairs)
+    mapper = executor.map if executor is not None else map
+    results = list(mapper(reconcile_pair, [pairs[r][0] for r in regions], [pairs[r][1] for r in regions],
+                          [layout] * len(regions)))
+    return {
+        "regions": {r: {"changes_summary": summary, "table_data": table}
+                    for r, (_, summary, table) in zip(regions, results)},
+        "changes_summary": aggregate(summary for _, summary, _ in results),
+        "workbook": write_batch({r: df for r, (df, _, _) in zip(regions, results)},
+                                layout.sheet_name, backend, bundle),
+    }
+
+
+# ---------- Línea de comandos ----------
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+    from concurrent.futures import ProcessPoolExecutor
+    from datetime import datetime
+
+    from template_registry import DEFAULT_TEMPLATE, TemplateRegistry
+
+    parser = argparse.ArgumentParser(description="Reconciliación de varias regiones (zip o directorio).")
+    parser.add_argument("source", help="zip o directorio con los pares fleet + disponibilidad")
+    parser.add_argument("--out", help="archivo de salida (default: vehicle_fleet_update_<fecha>.xlsx|.zip)")
+    parser.add_argument("--zip", action="store_true", help="un archivo por región en un zip")
+    parser.add_argument("--csv", action="store_true", help="CSV por región (implica --zip)")
+    parser.add_argument("--template", default="./Planilla-Modelo.xlsx")
+    parser.add_argument("--sheet", default="Worksheet")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args(argv)
+
+    bundle = "zip" if (args.zip or args.csv) else "sheets"
+    backend = "csv" if args.csv else DEFAULT_BACKEND
+    # El template se parsea una sola vez para todo el lote
+    templates = TemplateRegistry()
+    templates.register(DEFAULT_TEMPLATE, args.template, args.sheet)
+    layout = templates.get(DEFAULT_TEMPLATE)
+    try:
+        if os.path.isdir(args.source):
+            pairs = read_directory(args.source)
+        else:
+            with open(args.source, "rb") as f:
+                pairs = read_zip(f.read())
+        with ProcessPoolExecutor(max_workers=min(args.workers or 1, len(pairs))) as executor:
+            result = run_batch(pairs, layout, backend, bundle, executor)
+    except PipelineError as e:
+        print(f"❌ {e.message}")
+        return 1
+
+    extension = format_info(batch_format(backend, bundle))["extension"]
+    out = args.out or f"vehicle_fleet_update_{datetime.now().strftime('%d%m%Y')}.{extension}"
+    with open(out, "wb") as f:
+        f.write(result["workbook"].getbuffer())
+
+    for region, data in result["regions"].items():
+        s = data["changes_summary"]
+        print(f"➡️  {region}: {s['total_rows']} vehículos a actualizar "
+              f"(Estado {s['estado_changes']}, SVC {s['svc_changes']}, MLP {s['mlp_changes']})")
+    total = result["changes_summary"]
+    print(f"\n🔄 Total: {total.get('total_rows', 0)} vehículos en {len(result['regions'])} regiones")
+    print(f"📁 Archivo generado: {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,81 @@
+"""
+Cliente ASGI mínimo para los benchmarks: llama a la app en el mismo proceso, sin red
+ni dependencias extra (httpx/TestClient).
+"""
+import asyncio
+import json
+from typing import Dict, Iterable, Tuple, Union
+from uuid import uuid4
+
+Field = Union[str, Tuple[str, bytes]]
+
+
+def multipart(fields: Dict[str, Field]) -> Tuple[bytes, str]:
+    """Codifica `fields` como multipart/form-data. Archivos: (nombre, bytes)."""
+    boundary = uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        if isinstance(value, tuple):
+            filename, data = value
+            head = (f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                    "Content-Type: application/octet-stream\r\n\r\n")
+        else:
+            head = f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n'
+            data = value.encode()
+        parts += [head.encode(), data, b"\r\n"]
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+class Response:
+    def __init__(self, status: int, headers: Dict[str, str], body: bytes):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body)
+
+
+async def request(app, method: str, path: str, body: bytes = b"",
+                  headers: Iterable[Tuple[str, str]] = (), chunk_size: int = 64 * 1024) -> Response:
+    """Un request completo; el cuerpo llega en trozos de `chunk_size` como con uvicorn."""
+    path, _, query = path.partition("?")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": method, "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": query.encode(), "root_path": "",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in headers]
+                   + [(b"content-length", str(len(body)).encode())],
+        "client": ("127.0.0.1", 0), "server": ("testserver", 80),
+    }
+    view = memoryview(body)
+    offset = 0
+    sent = False
+    status, out_headers, chunks = 0, {}, []
+
+    async def receive():
+        nonlocal sent, offset
+        if not sent:
+            chunk = bytes(view[offset:offset + chunk_size])
+            offset += len(chunk)
+            sent = offset >= len(body)
+            return {"type": "http.request", "body": chunk, "more_body": not sent}
+        # El cliente no se desconecta: quedarse esperando hasta que la app cancele
+        await asyncio.Event().wait()
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            out_headers.update({k.decode(): v.decode() for k, v in message.get("headers", [])})
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return Response(status, out_headers, b"".join(chunks))
+
+
+async def post_files(app, path: str, fields: Dict[str, Field], **kwargs) -> Response:
+    body, content_type = multipart(fields)
+    return await request(app, "POST", path, body, [("content-type", content_type)], **kwargs)
@@ -0,0 +1,83 @@
+"""
+Prueba de carga: latencia de /heartbeat mientras corren N /process concurrentes.
+
+Con el pipeline en el pool de workers, el event loop queda libre y /heartbeat responde
+igual que en reposo. Los /process que exceden WORKER_MAX + WORKER_QUEUE reciben 429.
+Cada /process lleva planillas propias (otra `seed`): con las mismas, todos serían aciertos
+de la caché de resultados/parseo y no se mediría el pool.
+
+    python benchmarks/bench_concurrency.py --jobs 4 --plates 5000
+    WORKER_POOL=thread python benchmarks/bench_concurrency.py --jobs 4
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+async def _heartbeats(app, request, stop: asyncio.Event, interval: float):
+    latencies = []
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        await request(app, "GET", "/heartbeat")
+        latencies.append(time.perf_counter() - t0)
+        await asyncio.sleep(interval)
+    return latencies
+
+
+def _summary(latencies):
+    ms = sorted(x * 1000 for x in latencies)
+    p95 = ms[int(len(ms) * 0.95) - 1] if len(ms) >= 20 else ms[-1]
+    return f"n={len(ms):4d}  p50={statistics.median(ms):7.2f} ms  p95={p95:7.2f} ms  max={ms[-1]:7.2f} ms"
+
+
+async def run(args):
+    os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    import main
+    from benchmarks.asgi import post_files, request
+    from benchmarks.synthetic import disponibilidad_workbook, fleet_workbook
+
+    def fields(seed: int) -> dict:
+        fleet = fleet_workbook(args.plates, seed=seed, extra_cols=10)
+        disp = disponibilidad_workbook(args.plates, seed=seed)
+        return {"fleet_file": ("fleet.xlsx", fleet), "disponibilidad_file": ("disp.xlsx", disp)}
+
+    warmup = fields(0)
+    jobs = [fields(seed) for seed in range(1, args.jobs + 1)]
+
+    async with main.app.router.lifespan_context(main.app):
+        print(f"pool: {main.worker_pool.stats()}")
+        # Calentar workers (spawn + imports) fuera de la medición
+        await post_files(main.app, "/process", warmup)
+
+        stop = asyncio.Event()
+        idle = asyncio.create_task(_heartbeats(main.app, request, stop, args.interval))
+        await asyncio.sleep(2)
+        stop.set()
+        print(f"heartbeat en reposo       {_summary(await idle)}")
+
+        stop = asyncio.Event()
+        hb = asyncio.create_task(_heartbeats(main.app, request, stop, args.interval))
+        t0 = time.perf_counter()
+        responses = await asyncio.gather(*(post_files(main.app, "/process", job) for job in jobs))
+        elapsed = time.perf_counter() - t0
+        stop.set()
+        print(f"heartbeat con {args.jobs} /process {_summary(await hb)}")
+        print(f"/process: {dict(Counter(r.status for r in responses))} en {elapsed:.1f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs", type=int, default=4)
+    parser.add_argument("--plates", type=int, default=5000)
+    parser.add_argument("--interval", type=float, default=0.05)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
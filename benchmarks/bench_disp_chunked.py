@@ -0,0 +1,97 @@
+"""
+Disponibilidad completa en memoria vs agregada en streaming (disp_summary.py): tiempo de
+`parse_disponibilidad` + moda por placa, pico de memoria y tamaño del frame resultante.
+
+La planilla sintética se escribe a un archivo temporal y se lee desde disco (como un upload
+grande). Cada modo corre en un subproceso propio para que el pico de RSS no se mezcle;
+tracemalloc mide el pico de memoria de Python durante la lectura. También verifica que la
+moda y las placas sean idénticas en los dos modos.
+
+    python benchmarks/bench_disp_chunked.py --plates 20000 --rows-per-vehicle 20
+"""
+import argparse
+import json
+import os
+import pickle
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+MODES = {"en memoria": "0", "streaming": "1"}
+
+
+def _rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # Linux: KB
+
+
+def child(path: str, chunked: bool, dump: str):
+    from pipeline import parse_disponibilidad, source_rows
+    from reconcile import modal_targets
+
+    def read():
+        with open(path, "rb") as f:
+            disp = parse_disponibilidad(f, chunked=chunked)
+        return disp, modal_targets(*disp)
+
+    before = _rss_mb()
+    t0 = time.perf_counter()
+    read()
+    elapsed = time.perf_counter() - t0
+    rss_peak = _rss_mb()
+    # Segunda pasada con tracemalloc (que la hace varias veces más lenta) solo para el pico
+    tracemalloc.start()
+    disp, targets = read()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    df, cols = disp
+    with open(dump, "wb") as f:
+        pickle.dump((list(df[cols["veic"]].dropna().unique()), targets), f)
+    print(json.dumps({"seconds": elapsed, "rows": source_rows(df), "vehicles": int(df[cols["veic"]].nunique()),
+                      "frame_mb": df.memory_usage(deep=True).sum() / 1e6, "traced_peak_mb": peak / 1e6,
+                      "rss_before_mb": before, "rss_peak_mb": rss_peak}))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--plates", type=int, default=20_000, help="placas de la flota (30%% figura en disponibilidad)")
+    parser.add_argument("--rows-per-vehicle", type=int, default=20, help="filas promedio por vehículo")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--chunked", help=argparse.SUPPRESS)
+    parser.add_argument("--dump", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return child(args.child, args.chunked == "1", args.dump)
+
+    from benchmarks.synthetic import disponibilidad_workbook
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "disp.xlsx")
+        with open(path, "wb") as f:
+            f.write(disponibilidad_workbook(args.plates, rows_per_vehicle=args.rows_per_vehicle))
+        print(f"disponibilidad de {os.path.getsize(path) / 1e6:.1f} MB")
+        print(f"{'modo':<12}{'filas':>9}{'vehículos':>11}{'segundos':>10}{'frame MB':>10}"
+              f"{'pico tracemalloc MB':>21}{'RSS pico MB':>20}")
+        dumps = []
+        for name, chunked in MODES.items():
+            dump = os.path.join(tmp, f"{chunked}.pkl")
+            out = subprocess.run([sys.executable, __file__, "--child", path, "--chunked", chunked, "--dump", dump],
+                                 capture_output=True, text=True, check=True)
+            r = json.loads(out.stdout)
+            print(f"{name:<12}{r['rows']:>9}{r['vehicles']:>11}{r['seconds']:>10.2f}{r['frame_mb']:>10.2f}"
+                  f"{r['traced_peak_mb']:>21.1f}{r['rss_peak_mb']:>10.1f} (+{r['rss_peak_mb'] - r['rss_before_mb']:5.1f})")
+            with open(dump, "rb") as f:
+                dumps.append(pickle.load(f))
+    (plates_a, targets_a), (plates_b, targets_b) = dumps
+    same = plates_a == plates_b and targets_a.keys() == targets_b.keys() and all(
+        targets_a[k].equals(targets_b[k]) for k in targets_a)
+    print("resultados idénticos" if same else "¡RESULTADOS DISTINTOS!")
+
+
+if __name__ == "__main__":
+    main()
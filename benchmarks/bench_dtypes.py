@@ -0,0 +1,78 @@
+"""
+Columnas normalizadas como texto vs categóricas (COMPACT_DTYPES, ver pipeline.py): memoria de
+los frames de flota y disponibilidad y tiempo de normalizar, de la moda por placa y de las
+reglas completas (`build_update`), sobre frames sintéticos en memoria (los de
+bench_reconcile.py, sin leer XLSX). Verifica que la salida sea idéntica en los dos modos.
+
+    python benchmarks/bench_dtypes.py --plates 50000 --disp-rows 500000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+
+import pipeline  # noqa: E402
+from benchmarks.bench_reconcile import DISP_COLS, FLEET_COLS, TEMPLATE_COLS, TPL, frames  # noqa: E402
+from reconcile import modal_targets  # noqa: E402
+
+MODES = {"texto": False, "categórico": True}
+
+
+class _Layout:
+    columns, tpl_cols = TEMPLATE_COLS, TPL
+
+
+def _best(fn, repeat: int):
+    """(resultado, mejor tiempo de `repeat` corridas)."""
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return result, best
+
+
+def run(raw_fleet: pd.DataFrame, raw_disp: pd.DataFrame, compact: bool, repeat: int) -> dict:
+    pipeline.COMPACT_DTYPES = compact
+
+    def normalized():
+        fleet_df, disp_df = raw_fleet.copy(), raw_disp.copy()
+        pipeline._normalize_columns(fleet_df, FLEET_COLS)
+        pipeline._normalize_columns(disp_df, DISP_COLS)
+        return (fleet_df, FLEET_COLS), (disp_df, DISP_COLS)
+
+    (fleet, disp), normalize_s = _best(normalized, repeat)
+    _, modal_s = _best(lambda: modal_targets(*disp), repeat)
+    update, update_s = _best(lambda: pipeline.build_update(fleet, disp, _Layout), repeat)
+    memory = sum(int(df.memory_usage(deep=True).sum()) for df, _ in (fleet, disp))
+    return {"normalize_s": normalize_s, "modal_s": modal_s, "update_s": update_s, "mb": memory / 1e6,
+            "update": update}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--plates", type=int, default=50_000)
+    parser.add_argument("--disp-rows", type=int, default=500_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    fleet_df, disp_df = frames(args.plates, args.disp_rows)
+    # Como salen de ingest.py: listas de Python -> dtype inferido por pandas
+    raw_fleet, raw_disp = (pd.DataFrame({c: df[c].tolist() for c in df.columns}) for df in (fleet_df, disp_df))
+    print(f"flota {len(raw_fleet)} filas, disponibilidad {len(raw_disp)} filas (mejor de {args.repeat})")
+    print(f"{'modo':<12}{'frames MB':>11}{'normalizar s':>14}{'moda s':>9}{'reglas s':>10}")
+    results = {}
+    for name, compact in MODES.items():
+        r = results[name] = run(raw_fleet, raw_disp, compact, args.repeat)
+        print(f"{name:<12}{r['mb']:>11.1f}{r['normalize_s']:>14.3f}{r['modal_s']:>9.3f}{r['update_s']:>10.3f}")
+    (out_a, summary_a, table_a), (out_b, summary_b, table_b) = (r["update"] for r in results.values())
+    same = out_a.equals(out_b) and summary_a == summary_b and table_a == table_b
+    print("salida idéntica" if same else "¡SALIDA DISTINTA!")
+
+
+if __name__ == "__main__":
+    main()
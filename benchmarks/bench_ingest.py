@@ -0,0 +1,70 @@
+"""
+Compara la lectura completa (`pd.read_excel`) contra `ingest.read_columns` sobre una
+planilla de flota sintética.
+
+    python benchmarks/bench_ingest.py --rows 100000 [--memory]
+
+--memory repite cada lectura bajo tracemalloc para medir el pico de memoria (mucho más lento).
+"""
+import argparse
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+
+from benchmarks.synthetic import fleet_workbook  # noqa: E402
+from ingest import FLEET_COLUMNS, HAS_CALAMINE, read_columns  # noqa: E402
+
+
+def _measure(fn, memory: bool):
+    t0 = time.perf_counter()
+    df = fn()
+    elapsed = time.perf_counter() - t0
+    peak = None
+    if memory:
+        tracemalloc.start()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return df, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--memory", action="store_true")
+    args = parser.parse_args()
+
+    data = fleet_workbook(args.rows)
+    print(f"fleet sintético: {args.rows} filas, {len(data) / 1e6:.1f} MB")
+
+    def full():
+        df = pd.read_excel(io.BytesIO(data))
+        df.columns = df.columns.str.strip()
+        return df
+
+    paths = [("pd.read_excel", full),
+             ("read_columns[xml]", lambda: read_columns(data, FLEET_COLUMNS, engine="xml")),
+             ("read_columns[openpyxl]", lambda: read_columns(data, FLEET_COLUMNS, engine="openpyxl"))]
+    if HAS_CALAMINE:
+        paths.append(("read_columns[calamine]", lambda: read_columns(data, FLEET_COLUMNS, engine="calamine")))
+
+    reference = None
+    for name, fn in paths:
+        df, elapsed, peak = _measure(fn, args.memory)
+        if reference is None:
+            reference = df
+        else:
+            same = reference[list(df.columns)].equals(df)
+            assert same, f"{name}: resultado distinto a pd.read_excel"
+        mem = f"   pico {peak / 1e6:8.1f} MB" if peak is not None else ""
+        print(f"{name:26s} {elapsed:8.2f} s{mem}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Compara `reconcile.reconcile` contra el loop por placa anterior (groupby.apply + dicts)
+sobre frames sintéticos en memoria, verificando que la salida sea idéntica.
+
+    python benchmarks/bench_reconcile.py --plates 50000 --disp-rows 200000
+"""
+import argparse
+import os
+import sys
+import time
+from typing import Dict, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from benchmarks.synthetic import BASES, CENTROS, ESTADOS, plates  # noqa: E402
+from reconcile import reconcile  # noqa: E402
+
+TEMPLATE_COLS = ["Dominio", "Unidad", "Base", "Modelo", "Centro de Custos", "Estado"]
+TPL = {"dominio": "Dominio", "estado": "Estado", "base": "Base", "mlp": "Centro de Custos"}
+FLEET_COLS = {"placa": "Placa", "estado": "Estado", "svc": "Base", "mlp": "Centro de Custos"}
+DISP_COLS = {"veic": "Veículo", "svc": "Base", "mlp": "Centro de Custos"}
+
+
+def frames(n_plates: int, disp_rows: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    pl = np.array(plates(n_plates, seed), dtype=object)
+    fleet_idx = np.concatenate([np.arange(n_plates), rng.integers(0, n_plates, n_plates // 20)])
+    fleet = pd.DataFrame({
+        "Placa": pl[fleet_idx],
+        "Base": rng.choice(BASES, len(fleet_idx)),
+        "Centro de Custos": rng.choice(CENTROS, len(fleet_idx)),
+        "Estado": rng.choice(ESTADOS, len(fleet_idx)),
+    })
+    disp_plates = rng.choice(pl[: int(n_plates * 0.6)], disp_rows)
+    disp = pd.DataFrame({
+        "Veículo": disp_plates,
+        # Pocos valores por placa para forzar empates en la moda
+        "Base": rng.choice(BASES[:3], disp_rows),
+        "Centro de Custos": rng.choice(CENTROS[:2], disp_rows),
+    })
+    disp.loc[rng.random(disp_rows) < 0.05, "Base"] = None
+    return fleet, disp
+
+
+def _most_frequent(series: pd.Series) -> Optional[str]:
+    s = series.dropna().astype(str).str.upper().str.strip()
+    if s.empty:
+        return None
+    return s.value_counts().idxmax()
+
+
+def legacy(fleet_df, disp_df):
+    """Implementación anterior de process_files (loop por placa)."""
+    placa_col, estado_col, veic_col = "Placa", "Estado", "Veículo"
+    activos = set(fleet_df[fleet_df[estado_col] == 'ATIVO - BIPANDO'][placa_col])
+    ociosos = set(fleet_df[fleet_df[estado_col] == 'FROTA OCIOSA'][placa_col])
+    disp_set = set(disp_df[veic_col].dropna())
+    svc_target_map = disp_df.groupby(veic_col)["Base"].apply(_most_frequent).to_dict()
+    mlp_target_map = disp_df.groupby(veic_col)["Centro de Custos"].apply(_most_frequent).to_dict()
+    svc_current_map = fleet_df.set_index(placa_col)["Base"].to_dict()
+    mlp_current_map = fleet_df.set_index(placa_col)["Centro de Custos"].to_dict()
+
+    changes_summary = {"svc_changes": 0, "mlp_changes": 0, "estado_changes": 0, "both_changes": 0, "total_rows": 0}
+    rows_by_plate: Dict[str, dict] = {}
+
+    def ensure_row(plate):
+        if plate not in rows_by_plate:
+            rows_by_plate[plate] = {col: "" for col in TEMPLATE_COLS}
+            rows_by_plate[plate]["Dominio"] = plate
+        return rows_by_plate[plate]
+
+    for plate in sorted(activos & disp_set):
+        ensure_row(plate)["Estado"] = 'FROTA OCIOSA'
+        changes_summary["estado_changes"] += 1
+    for plate in sorted(ociosos - disp_set):
+        ensure_row(plate)["Estado"] = 'ATIVO - BIPANDO'
+        changes_summary["estado_changes"] += 1
+    for plate in fleet_df[placa_col].unique():
+        svc_tgt, mlp_tgt = svc_target_map.get(plate), mlp_target_map.get(plate)
+        svc_cur, mlp_cur = svc_current_map.get(plate), mlp_current_map.get(plate)
+        svc_changed = mlp_changed = False
+        if svc_tgt and svc_tgt != (svc_cur or ""):
+            ensure_row(plate)["Base"] = svc_tgt
+            svc_changed = True
+        if mlp_tgt and mlp_tgt != (mlp_cur or ""):
+            ensure_row(plate)["Centro de Custos"] = mlp_tgt
+            mlp_changed = True
+        changes_summary["both_changes"] += svc_changed and mlp_changed
+        changes_summary["svc_changes"] += svc_changed
+        changes_summary["mlp_changes"] += mlp_changed
+    output_df = pd.DataFrame(list(rows_by_plate.values()), columns=TEMPLATE_COLS)
+    changes_summary["total_rows"] = len(output_df)
+    return output_df, changes_summary
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--plates", type=int, default=50_000)
+    parser.add_argument("--disp-rows", type=int, default=200_000)
+    args = parser.parse_args()
+
+    fleet, disp = frames(args.plates, args.disp_rows)
+    t0 = time.perf_counter()
+    old_df, old_summary = legacy(fleet, disp)
+    t_old = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    new_df, new_summary = reconcile(fleet, disp, FLEET_COLS, DISP_COLS, TEMPLATE_COLS, TPL)
+    t_new = time.perf_counter() - t0
+
+    assert old_summary == new_summary, (old_summary, new_summary)
+    # NaN del loop anterior y "" quedan igual en el Excel (celda vacía)
+    assert old_df.astype(object).fillna("").equals(new_df.astype(object)), "salida distinta al loop anterior"
+    print(f"fleet {len(fleet)} filas, disponibilidad {len(disp)} filas -> {new_summary}")
+    print(f"loop anterior  {t_old:8.2f} s")
+    print(f"reconcile      {t_new:8.2f} s   (x{t_old / t_new:.1f})")
+
+
+if __name__ == "__main__":
+    main()
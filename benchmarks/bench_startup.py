@@ -0,0 +1,108 @@
+"""
+Arranque en frío: cuánto tarda un uvicorn recién lanzado en dar el primer byte y en
+responder el primer /process.
+
+Por cada modo se lanza `uvicorn` en un puerto libre y, desde el instante del lanzamiento:
+
+- heartbeat: primera respuesta de GET /heartbeat (se reintenta hasta que el puerto acepta).
+- index:     GET / justo después.
+- process:   POST /process (flota sintética) justo después, o `--settle` segundos después
+             (un usuario que abre la página y recién ahí sube los archivos); también su
+             duración propia.
+
+Modos: `main` sin pre-calentamiento (STARTUP_WARMUP=0, como antes), `main` con
+pre-calentamiento y `boot` (arranque liviano, ver boot.py).
+
+    python benchmarks/bench_startup.py --plates 2000 --repeat 3
+    python benchmarks/bench_startup.py --plates 100 --settle 3
+    WORKER_POOL=thread python benchmarks/bench_startup.py
+"""
+import argparse
+import http.client
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.asgi import multipart  # noqa: E402
+from benchmarks.synthetic import disponibilidad_workbook, fleet_workbook  # noqa: E402
+
+MODES = {
+    "main (sin pre-calentar)": ("main:app", {"STARTUP_WARMUP": "0"}),
+    "main (pre-calentado)": ("main:app", {"STARTUP_WARMUP": "1"}),
+    "boot": ("boot:app", {"STARTUP_WARMUP": "1"}),
+}
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _request(port: int, method: str, path: str, body: bytes = b"", headers=None, timeout: float = 120):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=timeout)
+    try:
+        conn.request(method, path, body=body, headers=headers or {})
+        response = conn.getresponse()
+        response.read()
+        return response.status
+    finally:
+        conn.close()
+
+
+def measure(app: str, env: dict, body: bytes, content_type: str, settle: float = 0, timeout: float = 60) -> dict:
+    port = _free_port()
+    t0 = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", app, "--port", str(port), "--log-level", "warning"],
+                            cwd=ROOT, env={**os.environ, **env})
+    try:
+        while True:
+            try:
+                status = _request(port, "GET", "/heartbeat", timeout=timeout)
+                break
+            except (ConnectionRefusedError, ConnectionResetError):
+                if proc.poll() is not None or time.perf_counter() - t0 > timeout:
+                    raise RuntimeError(f"{app} no arrancó")
+                time.sleep(0.005)
+        heartbeat = time.perf_counter() - t0
+        _request(port, "GET", "/")
+        index = time.perf_counter() - t0
+        time.sleep(settle)
+        t1 = time.perf_counter()
+        process_status = _request(port, "POST", "/process", body, {"Content-Type": content_type})
+        process = time.perf_counter() - t0
+        if status != 200 or process_status != 200:
+            raise RuntimeError(f"{app}: heartbeat {status}, process {process_status}")
+        return {"heartbeat": heartbeat, "index": index, "process": process, "process_only": time.perf_counter() - t1}
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--plates", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--settle", type=float, default=0, help="espera entre GET / y el POST /process")
+    args = parser.parse_args()
+
+    body, content_type = multipart({"fleet_file": ("fleet.xlsx", fleet_workbook(args.plates)),
+                                    "disponibilidad_file": ("disp.xlsx", disponibilidad_workbook(args.plates))})
+    print(f"{args.plates} placas, WORKER_POOL={os.environ.get('WORKER_POOL', 'process')}, "
+          f"espera {args.settle:g} s, mediana de {args.repeat} arranques (segundos desde el lanzamiento)")
+    print(f"{'modo':<26}{'heartbeat':>11}{'index':>9}{'1er /process':>14}{'(solo /process)':>17}")
+    for name, (app, env) in MODES.items():
+        runs = [measure(app, env, body, content_type, args.settle) for _ in range(args.repeat)]
+        med = {key: statistics.median(r[key] for r in runs) for key in runs[0]}
+        print(f"{name:<26}{med['heartbeat']:>11.3f}{med['index']:>9.3f}{med['process']:>14.3f}"
+              f"{med['process_only']:>17.3f}")
+
+
+if __name__ == "__main__":
+    main()
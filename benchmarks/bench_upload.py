@@ -0,0 +1,88 @@
+"""
+Pico de memoria de un POST /process completo (upload + lectura + reglas + escritura).
+
+Cada corrida va en un subproceso propio; se mide el pico de tracemalloc durante el request
+(asignaciones Python/numpy, incluidas las copias del upload) y el pico de RSS del proceso.
+El cuerpo multipart se arma antes de empezar a medir y llega en trozos de 64 KB.
+
+    python benchmarks/bench_upload.py --plates 50000
+    WORKER_POOL=process python benchmarks/bench_upload.py --plates 50000
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def _rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # Linux: KB
+
+
+def child(fleet_path: str, disp_path: str) -> dict:
+    os.environ.setdefault("WORKER_POOL", "thread")
+    os.chdir(ROOT)
+    import main
+    from benchmarks.asgi import multipart, request
+
+    with open(fleet_path, "rb") as f:
+        fleet = f.read()
+    with open(disp_path, "rb") as f:
+        disp = f.read()
+    body, content_type = multipart({"fleet_file": ("fleet.xlsx", fleet), "disponibilidad_file": ("disp.xlsx", disp)})
+    upload_mb = len(body) / 2**20
+    del fleet, disp
+
+    async def go():
+        async with main.app.router.lifespan_context(main.app):
+            rss_before = _rss_mb()
+            tracemalloc.start()
+            before = tracemalloc.get_traced_memory()[0]
+            t0 = time.perf_counter()
+            r = await request(main.app, "POST", "/process", body, [("content-type", content_type)])
+            seconds = time.perf_counter() - t0
+            peak = tracemalloc.get_traced_memory()[1] - before
+            tracemalloc.stop()
+            return {"status": r.status, "seconds": round(seconds, 3), "upload_mb": round(upload_mb, 2),
+                    "traced_peak_mb": round(peak / 2**20, 1), "rss_before_mb": round(rss_before, 1),
+                    "rss_peak_mb": round(_rss_mb(), 1)}
+
+    return asyncio.run(go())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--plates", type=int, default=50_000)
+    parser.add_argument("--child", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        print(json.dumps(child(*args.child)))
+        return
+
+    import tempfile
+
+    from benchmarks.synthetic import disponibilidad_workbook, fleet_workbook
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fleet_path, disp_path = os.path.join(tmp, "fleet.xlsx"), os.path.join(tmp, "disp.xlsx")
+        with open(fleet_path, "wb") as f:
+            f.write(fleet_workbook(args.plates))
+        with open(disp_path, "wb") as f:
+            f.write(disponibilidad_workbook(args.plates))
+        out = subprocess.run([sys.executable, __file__, "--child", fleet_path, disp_path],
+                             capture_output=True, text=True, check=True)
+    r = json.loads(out.stdout.strip().splitlines()[-1])
+    print(f"{args.plates} placas, upload {r['upload_mb']} MB ({os.environ.get('WORKER_POOL', 'thread')}): "
+          f"HTTP {r['status']} en {r['seconds']} s, pico tracemalloc {r['traced_peak_mb']} MB, "
+          f"RSS {r['rss_before_mb']} -> {r['rss_peak_mb']} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Memoria por vehículo y latencia del índice por placa de /vehicles (vehicle_index.py), sobre
+frames sintéticos en memoria (los de bench_reconcile.py).
+
+La memoria retenida se mide con tracemalloc (lo que queda vivo después de construir; las
+placas se comparten con el frame de la flota) y se compara con `nbytes` (lo que reporta
+/stats, contando las placas) y con un dict de dicts por placa. El tiempo de armado no
+incluye la moda de disponibilidad, que el pipeline ya calcula para /process.
+
+    python benchmarks/bench_vehicle_index.py --plates 10000 100000 1000000
+"""
+import argparse
+import gc
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_reconcile import DISP_COLS, FLEET_COLS, frames  # noqa: E402
+from reconcile import modal_targets  # noqa: E402
+from vehicle_index import VehicleIndex  # noqa: E402
+
+
+def _retained(build):
+    """(objeto, bytes que siguen asignados después de construirlo)."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    obj = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return obj, after - before
+
+
+def run(n: int, lookups: int = 10_000, bulk: int = 1_000) -> dict:
+    fleet_df, disp_df = frames(n, n * 2)
+    fleet, disp = (fleet_df, FLEET_COLS), (disp_df, DISP_COLS)
+
+    # En el pipeline la moda de disponibilidad ya está calculada (build_indexed_update)
+    targets = modal_targets(*disp)
+    t0 = time.perf_counter()
+    index = VehicleIndex.build(fleet, disp, targets)
+    build_seconds = time.perf_counter() - t0
+    del index
+    index, retained = _retained(lambda: VehicleIndex.build(fleet, disp, targets))
+    as_dicts, dict_bytes = _retained(lambda: {index.plates[i]: index._record(i) for i in range(len(index))})
+    del as_dicts
+
+    rnd = random.Random(0)
+    sample = [index.plates[rnd.randrange(len(index))].lower() for _ in range(lookups)]
+    times = []
+    for plate in sample:
+        t = time.perf_counter()
+        index.lookup(plate)
+        times.append(time.perf_counter() - t)
+    t = time.perf_counter()
+    index.lookup_many(sample[:bulk])
+    bulk_seconds = time.perf_counter() - t
+
+    vehicles = len(index)
+    return {"plates": n, "vehicles": vehicles, "build_s": build_seconds,
+            "bytes_per_vehicle": retained / vehicles, "nbytes_per_vehicle": index.nbytes / vehicles,
+            "dict_bytes_per_vehicle": dict_bytes / vehicles,
+            "lookup_us": statistics.median(times) * 1e6, "bulk_ms": bulk_seconds * 1e3}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--plates", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--bulk", type=int, default=1_000, help="placas por lookup_many")
+    args = parser.parse_args()
+    print(f"{'placas':>9}{'vehículos':>11}{'armado s':>10}{'B/vehículo':>12}{'nbytes':>9}{'dict':>8}"
+          f"{'lookup µs':>11}{f'{args.bulk} placas ms':>17}")
+    for n in args.plates:
+        r = run(n, bulk=args.bulk)
+        print(f"{r['plates']:>9}{r['vehicles']:>11}{r['build_s']:>10.3f}{r['bytes_per_vehicle']:>12.0f}"
+              f"{r['nbytes_per_vehicle']:>9.0f}{r['dict_bytes_per_vehicle']:>8.0f}{r['lookup_us']:>11.1f}"
+              f"{r['bulk_ms']:>17.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Tiempo de escritura y pico de RSS de cada backend de writers.py.
+
+Cada backend corre en un subproceso propio para que el pico de RSS no se mezcle.
+
+    python benchmarks/bench_writers.py --rows 50000
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def _rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # Linux: KB
+
+
+def _frame(rows: int):
+    import numpy as np
+    import pandas as pd
+
+    from benchmarks.synthetic import BASES, plates
+    from template_registry import load_template_headers
+
+    columns, _ = load_template_headers(os.path.join(ROOT, "Planilla-Modelo.xlsx"), "Worksheet")
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame("", index=pd.RangeIndex(rows), columns=columns, dtype=object)
+    df["Dominio"] = plates(rows)
+    df["Estado"] = rng.choice(["FROTA OCIOSA", "ATIVO - BIPANDO", ""], rows)
+    df["Base"] = np.where(rng.random(rows) < 0.3, rng.choice(BASES, rows), "")
+    return df
+
+
+def child(backend: str, rows: int):
+    from writers import write_output
+
+    df = _frame(rows)
+    before = _rss_mb()
+    t0 = time.perf_counter()
+    stream = write_output(df, "Worksheet", backend)
+    elapsed = time.perf_counter() - t0
+    print(json.dumps({"backend": backend, "seconds": elapsed, "bytes": stream.getbuffer().nbytes,
+                      "rss_before_mb": before, "rss_peak_mb": _rss_mb()}))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return child(args.child, args.rows)
+
+    from writers import available_backends
+
+    print(f"{args.rows} filas x columnas de Planilla-Modelo.xlsx")
+    for backend in available_backends():
+        out = subprocess.run([sys.executable, __file__, "--rows", str(args.rows), "--child", backend],
+                             capture_output=True, text=True, check=True)
+        r = json.loads(out.stdout)
+        print(f"{backend:22s} {r['seconds']:7.2f} s  {r['bytes'] / 1e6:6.2f} MB  "
+              f"RSS pico {r['rss_peak_mb']:7.1f} MB (+{r['rss_peak_mb'] - r['rss_before_mb']:.1f} al escribir)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+"""
+Suite reproducible de extremo a extremo con planillas sintéticas.
+
+Por cada tamaño de flota genera fleet/disponibilidad (con `--dup-rate`, `--mismatch` de
+Base/Centro de Custos y `--estado-mismatch`; se guardan en benchmarks/data/ y se reutilizan)
+y mide, cada cosa en un subproceso propio para que el pico de memoria no se mezcle:
+
+- stages:  etapas del pipeline por separado (tiempo, y pico de tracemalloc en una 2ª pasada).
+- asgi:    POST /process + GET /download contra la app ASGI, sin red (WORKER_POOL=thread).
+- offline: offline_fleet_analysis.py sobre las mismas planillas.
+
+El resultado se guarda como JSON (por defecto benchmarks/results/<commit>.json) y
+`--compare` muestra la variación entre dos corridas.
+
+    python benchmarks/suite.py --plates 1000 10000 100000
+    python benchmarks/suite.py --plates 1000000 --extra-cols 5 --no-offline
+    python benchmarks/suite.py --compare benchmarks/results/abc1234.json benchmarks/results/def5678.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import runpy
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DATA_DIR = os.path.join(ROOT, "benchmarks", "data")
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+TEMPLATE = os.path.join(ROOT, "Planilla-Modelo.xlsx")
+
+
+def _rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # Linux: KB
+
+
+def _git(*args: str) -> str:
+    try:
+        return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+# ---------- Datos ----------
+def dataset(args, n: int):
+    """Rutas de fleet/disponibilidad para `n` placas (se generan una vez por combinación de parámetros)."""
+    from benchmarks.synthetic import disponibilidad_workbook, fleet_workbook
+
+    tag = (f"n{n}-s{args.seed}-dup{args.dup_rate}-mis{args.mismatch}-est{args.estado_mismatch}"
+           f"-sh{args.share}-x{args.extra_cols}")
+    fleet_path = os.path.join(DATA_DIR, f"fleet-{tag}.xlsx")
+    disp_path = os.path.join(DATA_DIR, f"disp-{tag}.xlsx")
+    seconds = 0.0
+    if not (os.path.exists(fleet_path) and os.path.exists(disp_path)):
+        os.makedirs(DATA_DIR, exist_ok=True)
+        t0 = time.perf_counter()
+        fleet = fleet_workbook(n, args.seed, extra_cols=args.extra_cols, dup_rate=args.dup_rate,
+                               estado_mismatch=args.estado_mismatch, share=args.share)
+        disp = disponibilidad_workbook(n, args.seed, share=args.share, mismatch=args.mismatch)
+        seconds = time.perf_counter() - t0
+        for path, data in ((fleet_path, fleet), (disp_path, disp)):
+            with open(path, "wb") as f:
+                f.write(data)
+    return fleet_path, disp_path, seconds
+
+
+# ---------- Mediciones (en subproceso) ----------
+def _layout():
+    from template_registry import DEFAULT_TEMPLATE, TemplateRegistry
+
+    registry = TemplateRegistry()
+    registry.register(DEFAULT_TEMPLATE, TEMPLATE, "Worksheet")
+    registry.load_all()
+    return registry.get(DEFAULT_TEMPLATE)
+
+
+def child_stages(fleet_path: str, disp_path: str) -> dict:
+    from pipeline import build_update, parse_disponibilidad, parse_fleet, write_workbook
+
+    layout = _layout()
+    with open(fleet_path, "rb") as f:
+        fleet_bytes = f.read()
+    with open(disp_path, "rb") as f:
+        disp_bytes = f.read()
+
+    def run(measure):
+        fleet = measure("parsing_fleet", parse_fleet, fleet_bytes)
+        disp = measure("parsing_disponibilidad", parse_disponibilidad, disp_bytes)
+        output_df, summary, _ = measure("reconciling", build_update, fleet, disp, layout)
+        workbook = measure("writing_xlsx", write_workbook, output_df, layout.sheet_name)
+        return {"fleet_rows": len(fleet[0]), "disponibilidad_rows": len(disp[0]), "output_rows": len(output_df),
+                "output_bytes": workbook.getbuffer().nbytes, "changes_summary": summary}
+
+    stages = {}
+
+    def timed(name, fn, *args):
+        t0 = time.perf_counter()
+        result = fn(*args)
+        stages[name] = {"seconds": round(time.perf_counter() - t0, 4), "rss_mb": round(_rss_mb(), 1)}
+        return result
+
+    def traced(name, fn, *args):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        result = fn(*args)
+        stages[name]["peak_mb"] = round((tracemalloc.get_traced_memory()[1] - before) / 2**20, 1)
+        return result
+
+    sizes = run(timed)
+    tracemalloc.start()
+    run(traced)
+    tracemalloc.stop()
+    return {**stages, "sizes": sizes}
+
+
+def child_asgi(fleet_path: str, disp_path: str) -> dict:
+    os.environ["WORKER_POOL"] = "thread"  # Memoria del pipeline en este mismo proceso
+    os.chdir(ROOT)
+    import main
+    from benchmarks.asgi import post_files, request
+
+    with open(fleet_path, "rb") as f:
+        fleet_bytes = f.read()
+    with open(disp_path, "rb") as f:
+        disp_bytes = f.read()
+
+    async def go():
+        async with main.app.router.lifespan_context(main.app):
+            t0 = time.perf_counter()
+            r = await post_files(main.app, "/process", {"fleet_file": ("fleet.xlsx", fleet_bytes),
+                                                        "disponibilidad_file": ("disp.xlsx", disp_bytes),
+                                                        "timings": "true"})
+            process_seconds = time.perf_counter() - t0
+            body = r.json()
+            if r.status != 200:
+                raise RuntimeError(f"/process {r.status}: {body}")
+            t0 = time.perf_counter()
+            d = await request(main.app, "GET", f"/download/{body['token']}")
+            return {"process_seconds": round(process_seconds, 4),
+                    "download_seconds": round(time.perf_counter() - t0, 4),
+                    "download_bytes": len(d.body), "timings": body["timings"], "sizes": body["sizes"]}
+
+    return asyncio.run(go())
+
+
+def child_offline(fleet_path: str, disp_path: str) -> dict:
+    workdir = tempfile.mkdtemp(prefix="bench-offline-")
+    try:
+        shutil.copy(fleet_path, os.path.join(workdir, "fleet-moviles.xlsx"))
+        shutil.copy(disp_path, os.path.join(workdir, "disponibilidad.xlsx"))
+        shutil.copy(TEMPLATE, os.path.join(workdir, "Planilla-Modelo.xlsx"))
+        os.chdir(workdir)
+        os.environ.pop("FLEET_SNAPSHOT", None)
+        t0 = time.perf_counter()
+        script = os.path.join(ROOT, "offline_fleet_analysis.py")
+        with open(os.devnull, "w") as devnull:
+            # argv propio del script (sin el --child de la suite), como si se corriera suelto
+            (stdout, argv), (sys.stdout, sys.argv) = (sys.stdout, sys.argv), (devnull, [script])
+            try:
+                runpy.run_path(script, run_name="__main__")
+            except SystemExit as e:
+                if e.code:
+                    raise RuntimeError(f"offline_fleet_analysis.py terminó con código {e.code}")
+            finally:
+                sys.stdout, sys.argv = stdout, argv
+        return {"seconds": round(time.perf_counter() - t0, 4)}
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+CHILDREN = {"stages": child_stages, "asgi": child_asgi, "offline": child_offline}
+
+
+def _measure(kind: str, fleet_path: str, disp_path: str) -> dict:
+    out = subprocess.run([sys.executable, __file__, "--child", kind, fleet_path, disp_path],
+                         capture_output=True, text=True)
+    if out.returncode != 0:
+        return {"error": out.stderr.strip().splitlines()[-1] if out.stderr.strip() else f"exit {out.returncode}"}
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+# ---------- Reporte ----------
+def _flatten(run: dict, prefix: str = "") -> dict:
+    """{"asgi.process_seconds": 1.2, ...} con los valores numéricos comparables."""
+    flat = {}
+    for key, value in run.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(old_path: str, new_path: str):
+    with open(old_path, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)
+    print(f"{old['meta']['commit'] or old_path} -> {new['meta']['commit'] or new_path}")
+    old_runs = {r["plates"]: _flatten(r) for r in old["runs"]}
+    for run in new["runs"]:
+        before = old_runs.get(run["plates"])
+        if before is None:
+            continue
+        print(f"\n{run['plates']} placas")
+        for name, value in _flatten(run).items():
+            if name in before and (name.endswith("seconds") or name.endswith("_mb")):
+                ratio = value / before[name] if before[name] else float("inf")
+                print(f"  {name:45s} {before[name]:10.3f} -> {value:10.3f}  x{ratio:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--plates", type=int, nargs="+", default=[1_000, 10_000])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--dup-rate", type=float, default=0.05, help="placas repetidas en la flota")
+    parser.add_argument("--mismatch", type=float, default=0.05, help="filas de disponibilidad con otra Base/MLP")
+    parser.add_argument("--estado-mismatch", type=float, default=0.1, help="placas con el Estado equivocado")
+    parser.add_argument("--share", type=float, default=0.3, help="placas de la flota en disponibilidad")
+    parser.add_argument("--extra-cols", type=int, default=40, help="columnas de relleno en la flota")
+    parser.add_argument("--no-offline", action="store_true", help="no correr offline_fleet_analysis.py")
+    parser.add_argument("--offline-max-plates", type=int, default=100_000)
+    parser.add_argument("--out", help="archivo JSON (por defecto benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("ANTES", "DESPUES"))
+    parser.add_argument("--child", nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        kind, fleet_path, disp_path = args.child
+        result = CHILDREN[kind](fleet_path, disp_path)
+        result["rss_peak_mb"] = round(_rss_mb(), 1)
+        print(json.dumps(result))
+        return
+    if args.compare:
+        return compare(*args.compare)
+
+    import pandas as pd
+
+    commit = _git("rev-parse", "--short", "HEAD")
+    meta = {"commit": commit, "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+            "date": datetime.now().isoformat(timespec="seconds"), "python": platform.python_version(),
+            "pandas": pd.__version__, "machine": platform.machine(), "cpus": os.cpu_count(),
+            "params": {k: v for k, v in vars(args).items() if k not in ("child", "compare", "out")}}
+    runs = []
+    for n in args.plates:
+        fleet_path, disp_path, generate_seconds = dataset(args, n)
+        run = {"plates": n, "generate_seconds": round(generate_seconds, 2)}
+        kinds = ["stages", "asgi"]
+        if not args.no_offline and n <= args.offline_max_plates:
+            kinds.append("offline")
+        for kind in kinds:
+            run[kind] = _measure(kind, fleet_path, disp_path)
+        runs.append(run)
+
+        print(f"{n} placas")
+        if "error" in run["stages"]:
+            print(f"  stages                   ERROR {run['stages']['error']}")
+        for name, s in run["stages"].items():
+            if not isinstance(s, dict) or "seconds" not in s:
+                continue
+            print(f"  {name:24s} {s['seconds']:8.3f} s  pico {s.get('peak_mb', 0):8.1f} MB")
+        for kind in kinds[1:]:
+            r = run[kind]
+            seconds = r.get("process_seconds", r.get("seconds"))
+            print(f"  {kind:24s} " + (f"{seconds:8.3f} s  RSS {r['rss_peak_mb']:8.1f} MB" if "error" not in r
+                                       else f"ERROR {r['error']}"))
+
+    out = args.out or os.path.join(RESULTS_DIR, f"{commit or 'local'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump({"meta": meta, "runs": runs}, f, indent=2, ensure_ascii=False)
+    print(f"\nResultados: {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Generadores de planillas sintéticas con la estructura de fleet-moviles.xlsx / disponibilidad.xlsx.
+
+Ambos generadores parten de la misma flota (misma `seed`), así la disponibilidad puede
+coincidir o no con la Base / Centro de Custos de la flota según `mismatch`, y el Estado de
+la flota con la presencia en disponibilidad según `estado_mismatch`.
+"""
+import io
+import random
+from typing import List, Optional, Set, Tuple
+
+from openpyxl import Workbook
+
+ESTADOS = ["ATIVO - BIPANDO", "FROTA OCIOSA", "EM MANUTENÇÃO", "BAIXADO"]
+BASES = [f"SVC{i:02d}" for i in range(1, 41)]
+CENTROS = [f"MLP{i:03d}" for i in range(1, 31)]
+FLEET_HEADER = ["Placa", "Sub Região", "Base", "Responsável Base", "Marca", "Modelo", "Tipo",
+                "Ano", "Centro de Custos", "Kilometragem", "Observações", "Estado"]
+DISP_HEADER = ["Veículo", "Razão", "Modelo", "Modelo do Tipo", "Base", "Região", "Sub Região",
+               "Transportador", "Centro de Custos", "Data e hora de início da ociosidade", "Horas de ócio"]
+
+
+def plates(n: int, seed: int = 0) -> List[str]:
+    rnd = random.Random(seed)
+    letters = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    out = set()
+    while len(out) < n:
+        out.add("".join(rnd.choices(letters, k=3)) + f"{rnd.randrange(10)}"
+                + rnd.choice(letters) + f"{rnd.randrange(100):02d}")
+    return sorted(out)
+
+
+def fleet_records(n: int, seed: int = 0, dup_rate: float = 0.0) -> List[Tuple[str, str, str, str]]:
+    """(placa, base, centro, estado) por fila; `dup_rate` de las placas aparece dos veces."""
+    rnd = random.Random(seed + 1)
+    records = [(p, rnd.choice(BASES), rnd.choice(CENTROS), rnd.choice(ESTADOS)) for p in plates(n, seed)]
+    dups = [(p, rnd.choice(BASES), c, rnd.choice(ESTADOS)) for p, _, c, _ in rnd.sample(records, int(n * dup_rate))]
+    return records + dups
+
+
+def available_plates(n: int, seed: int = 0, share: float = 0.3) -> Set[str]:
+    """Placas de la flota que figuran en `disponibilidad_workbook(n, seed, share)`."""
+    records = fleet_records(n, seed)
+    return {p for p, _, _, _ in random.Random(seed + 3).sample(records, int(len(records) * share))}
+
+
+def _save(wb: Workbook) -> bytes:
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+def fleet_workbook(n: int, seed: int = 0, extra_cols: int = 40, dup_rate: float = 0.0,
+                   estado_mismatch: Optional[float] = None, share: float = 0.3) -> bytes:
+    """
+    Planilla de flota con `n` placas y `extra_cols` columnas de relleno (el export real tiene ~63).
+    Con `estado_mismatch`, el Estado sale de la disponibilidad de `share` (FROTA OCIOSA si figura,
+    ATIVO - BIPANDO si no) y esa fracción de placas trae el Estado contrario; si no, es al azar.
+    """
+    rnd = random.Random(seed + 2)
+    if estado_mismatch is not None:
+        idle = available_plates(n, seed, share)
+        flip = random.Random(seed + 4)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Worksheet")
+    ws.append(FLEET_HEADER + [f"Extra {i}" for i in range(extra_cols)])
+    for plate, base, centro, estado in fleet_records(n, seed, dup_rate):
+        if estado_mismatch is not None:
+            is_idle = (plate in idle) != (flip.random() < estado_mismatch)
+            estado = "FROTA OCIOSA" if is_idle else "ATIVO - BIPANDO"
+        ws.append([plate, "SP", base, "Fulano", "Renault", "Master", "Van",
+                   rnd.randrange(2015, 2025), centro, rnd.randrange(200000), None,
+                   estado] + [rnd.randrange(1000) for _ in range(extra_cols)])
+    return _save(wb)
+
+
+def disponibilidad_workbook(n: int, seed: int = 0, share: float = 0.3, rows_per_vehicle: int = 3,
+                            mismatch: float = 0.05, unknown: float = 0.02) -> bytes:
+    """
+    Disponibilidad (log con varias filas por vehículo) para la flota de `fleet_workbook(n, seed)`:
+    `share` de las placas figuran, `mismatch` de esas filas traen otra Base / Centro de Custos
+    y `unknown` agrega placas que no están en la flota.
+    """
+    rnd = random.Random(seed + 3)
+    records = fleet_records(n, seed)
+    chosen = rnd.sample(records, int(len(records) * share))
+    chosen += [(p, rnd.choice(BASES), rnd.choice(CENTROS), "") for p in plates(int(n * unknown), seed + 100)]
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Worksheet")
+    ws.append(DISP_HEADER)
+    for plate, base, centro, _ in chosen:
+        for _ in range(rnd.randint(1, 2 * rows_per_vehicle - 1)):
+            b = rnd.choice(BASES) if rnd.random() < mismatch else base
+            c = rnd.choice(CENTROS) if rnd.random() < mismatch else centro
+            ws.append([plate, "Sem rota", "Master", "Van", b, "SE", "SP", "Transp", c,
+                       "2024-01-01 08:00", rnd.randrange(1, 200)])
+    return _save(wb)
@@ -0,0 +1,103 @@
+"""
+Arranque liviano para instancias que se apagan sin tráfico (plan free de Render).
+
+    uvicorn boot:app --host 0.0.0.0 --port $PORT
+
+Este módulo usa solo la biblioteca estándar: el servidor acepta conexiones enseguida y
+main.py (FastAPI, pandas, openpyxl...) se importa en un hilo aparte, seguido de su lifespan
+(templates, pre-calentamiento, pool). Mientras tanto `/heartbeat` y `/` responden desde acá
+y el resto de los requests espera a que la app esté lista; después todo pasa a main.app.
+Si la carga falla, `/heartbeat` responde 503 con el error (para que el health check de la
+plataforma reinicie la instancia) y el resto, 503.
+"""
+import asyncio
+import importlib
+import json
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+APP_MODULE = "main"
+INDEX_PATH = "templates/index.html"
+HEARTBEAT = {"status": "ok", "message": "ZuCo API is running 🚐"}
+
+
+async def _respond(send, status: int, content_type: str, body: bytes):
+    await send({"type": "http.response.start", "status": status,
+                "headers": [(b"content-type", content_type.encode()), (b"content-length", str(len(body)).encode())]})
+    await send({"type": "http.response.body", "body": body})
+
+
+class LazyApp:
+    """App ASGI que carga `APP_MODULE` en segundo plano y delega en su `app` cuando está lista."""
+
+    def __init__(self, module: str = APP_MODULE):
+        self.module = module
+        self.app = None
+        self.load_seconds: float = 0.0
+        self.load_error: Exception = None
+        self._ready: asyncio.Event = None
+        self._loading: asyncio.Task = None
+        self._lifespan = None
+        self._index: bytes = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self._handle_lifespan(receive, send)
+        if self.app is None and scope["type"] == "http" and scope["method"] == "GET":
+            if scope["path"] == "/heartbeat":
+                if self.load_error is not None:
+                    body = json.dumps({"status": "error", "ready": False,
+                                       "error": f"{type(self.load_error).__name__}: {self.load_error}"},
+                                      ensure_ascii=False).encode()
+                    return await _respond(send, 503, "application/json", body)
+                body = json.dumps({**HEARTBEAT, "ready": False}, ensure_ascii=False).encode()
+                return await _respond(send, 200, "application/json", body)
+            if scope["path"] == "/":
+                return await _respond(send, 200, "text/html; charset=utf-8", self._index_html())
+        if self.app is None:
+            await self._ready.wait()
+        if self.app is None:
+            body = json.dumps({"error": "Serviço indisponível, tente novamente."}).encode()
+            return await _respond(send, 503, "application/json", body)
+        await self.app(scope, receive, send)
+
+    def _index_html(self) -> bytes:
+        if self._index is None:
+            with open(INDEX_PATH, "rb") as f:
+                self._index = f.read()
+        return self._index
+
+    # ---------- Ciclo de vida ----------
+    async def _handle_lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                self._ready = asyncio.Event()
+                self._loading = asyncio.create_task(self._load())
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self._loading
+                if self._lifespan is not None:
+                    await self._lifespan.__aexit__(None, None, None)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _load(self):
+        t0 = time.perf_counter()
+        try:
+            module = await asyncio.to_thread(importlib.import_module, self.module)
+            lifespan = module.app.router.lifespan_context(module.app)
+            await lifespan.__aenter__()
+            self._lifespan, self.app = lifespan, module.app
+            self.load_seconds = time.perf_counter() - t0
+            logger.info("%s listo en %.2f s", self.module, self.load_seconds)
+        except Exception as e:
+            self.load_error = e
+            logger.exception("No se pudo cargar %s", self.module)
+        finally:
+            self._ready.set()
+
+
+app = LazyApp()
@@ -0,0 +1,71 @@
+"""
+Cache LRU acotada por cantidad de entradas y por bytes, segura entre hilos.
+
+Se usa para resultados completos de /process (clave: hash de los archivos + versión del
+template + formato) y para frames ya parseados (clave: hash de un archivo).
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+def digest(data) -> str:
+    """sha256 hex de bytes / memoryview o de un archivo binario (leído por bloques desde el inicio)."""
+    if not hasattr(data, "read"):
+        return hashlib.sha256(data).hexdigest()
+    h = hashlib.sha256()
+    data.seek(0)
+    for block in iter(lambda: data.read(1024 * 1024), b""):
+        h.update(block)
+    return h.hexdigest()
+
+
+class LRUCache:
+    def __init__(self, max_entries: int = 32, max_bytes: int = 64 * 1024 * 1024,
+                 sizeof: Callable[[Any], int] = lambda value: 0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (value, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self._counters["misses"] += 1
+                return None
+            self._data.move_to_end(key)
+            self._counters["hits"] += 1
+            return item[0]
+
+    def put(self, key: Hashable, value: Any):
+        size = self.sizeof(value)
+        if size > self.max_bytes or self.max_entries <= 0:
+            return  # No entra: no se cachea
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._data[key] = (value, size)
+            self._bytes += size
+            while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._data.popitem(last=False)
+                self._bytes -= evicted_size
+                self._counters["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._counters, "entries": len(self._data), "bytes": self._bytes,
+                    "max_entries": self.max_entries, "max_bytes": self.max_bytes}
+
+    def __len__(self) -> int:
+        return len(self._data)
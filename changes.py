@@ -0,0 +1,81 @@
+"""
+Cambios de un resultado, paginados, para revisarlos sin descargar la planilla
+(GET /results/{token}/changes).
+
+`ChangeList` retiene de la planilla de salida solo la placa y los valores nuevos de Estado,
+Base y Centro de Custos (el resto de las columnas del template va vacío): la placa como texto
+y los valores, que se repiten mucho, como categóricas. Las posiciones de las filas de cada
+filtro se calculan una vez y las páginas son cortes de esas posiciones.
+"""
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+Columns = Dict[str, Optional[str]]
+
+# Filtros de la API: todas las filas o las que actualizan un campo
+FILTERS = ("all", "estado", "svc", "mlp")
+# Campo de la respuesta -> rol del template (svc = Base, mlp = Centro de Custos)
+_FIELDS = (("estado", "estado"), ("svc", "base"), ("mlp", "mlp"))
+
+
+class ChangeList:
+    def __init__(self, plates: np.ndarray, values: Dict[str, pd.Categorical]):
+        self.plates = plates
+        self.values = values
+        self._positions: Dict[str, np.ndarray] = {}
+
+    @classmethod
+    def build(cls, output_df: pd.DataFrame, tpl_cols: Columns) -> "ChangeList":
+        """A partir de la planilla de `reconcile` y los roles del template (`layout.tpl_cols`)."""
+        plates = output_df[tpl_cols["dominio"]].to_numpy(dtype=object)
+        values = {}
+        for field, tpl_role in _FIELDS:
+            col = tpl_cols.get(tpl_role)
+            column = output_df[col].to_numpy(dtype=object) if col else np.full(len(output_df), "", dtype=object)
+            values[field] = pd.Categorical(column)
+        return cls(plates, values)
+
+    def __len__(self) -> int:
+        return len(self.plates)
+
+    def positions(self, kind: str) -> np.ndarray:
+        """Filas de `kind` (ver FILTERS): todas o las que tienen valor nuevo en ese campo."""
+        positions = self._positions.get(kind)
+        if positions is None:
+            if kind == "all":
+                positions = np.arange(len(self))
+            else:
+                column = self.values[kind]
+                empty = column.categories.get_indexer([""])[0]  # -1 si ninguna fila está vacía
+                positions = np.flatnonzero(column.codes != empty)
+            self._positions[kind] = positions
+        return positions
+
+    def _row(self, i: int) -> dict:
+        row = {"plate": self.plates[i]}
+        for field, _ in _FIELDS:
+            column = self.values[field]
+            code = column.codes[i]
+            row[field] = (column.categories[code] or None) if code >= 0 else None
+        return row
+
+    def page(self, kind: str, page: int, size: int) -> dict:
+        """Página `page` (desde 1) de `size` filas de `kind`; más allá del final, sin filas."""
+        positions = self.positions(kind)
+        start = (page - 1) * size
+        rows: List[dict] = [self._row(i) for i in positions[start:start + size]]
+        return {"filter": kind, "page": page, "page_size": size, "total": len(positions),
+                "pages": -(-len(positions) // size), "rows": rows}
+
+    def counts(self) -> Dict[str, int]:
+        return {kind: len(self.positions(kind)) for kind in FILTERS}
+
+    @property
+    def nbytes(self) -> int:
+        """Memoria retenida: placas (con sus textos) y códigos/categorías."""
+        total = pd.Series(self.plates, dtype=object).memory_usage(deep=True, index=False)
+        for column in self.values.values():
+            total += column.memory_usage(deep=True)
+        return int(total)
@@ -0,0 +1,86 @@
+"""
+Disponibilidad agregada en streaming, para planillas que no entran en memoria.
+
+La disponibilidad es un log con muchas filas por vehículo, pero la reconciliación solo usa de
+ella el conjunto de placas (reglas de Estado) y la moda de Base / Centro de Custos por placa.
+`summarize_disponibilidad` recorre las filas del lector de ingest.py sin armar el DataFrame y
+lleva contadores por (placa, valor): la memoria crece con los vehículos (y sus valores)
+distintos, no con las filas. El resultado es un frame compacto, una fila por placa con su moda,
+que reemplaza al de `read_columns` en el pipeline: `modal_targets` y la pertenencia por placa
+dan exactamente lo mismo sobre los dos.
+
+Para que los resultados sean idénticos los valores se normalizan al final, una vez por valor
+distinto y con el dtype que pandas le daría a la columna completa (p. ej. una columna de
+números con celdas vacías queda float: 123 -> "123.0").
+"""
+from typing import Dict, Hashable, List, Optional
+
+import pandas as pd
+
+from ingest import DISP_COLUMNS, iter_records, pick_column
+from reconcile import modal_from_counts, normalize
+
+# Filas leídas de la planilla original (el frame compacto tiene una por vehículo)
+ROWS_ATTR = "source_rows"
+
+
+def _key(value) -> Hashable:
+    """Clave de conteo: lleva el tipo (salvo str) porque True == 1 pero se normalizan distinto."""
+    return value if value.__class__ is str else (value.__class__, value)
+
+
+_NONE = _key(None)
+
+
+def _normalized(distinct: Dict[Hashable, object]) -> Dict[Hashable, object]:
+    """Clave -> valor normalizado, infiriendo el dtype sobre los valores distintos de la columna."""
+    values = normalize(pd.Series(list(distinct.values())))
+    return dict(zip(distinct, values.tolist()))
+
+
+def summarize_disponibilidad(source, engine: Optional[str] = None) -> pd.DataFrame:
+    """
+    Frame compacto de disponibilidad (columnas reales de veic/svc/mlp, ya normalizadas): una
+    fila por placa, en orden de primera aparición, con la moda de cada columna (NaN si la placa
+    nunca tiene valor). `attrs[ROWS_ATTR]`: filas de la planilla. Sin columna de placa devuelve
+    las columnas encontradas sin filas (el pipeline lo informa como en el modo normal).
+    """
+    names, records = iter_records(source, DISP_COLUMNS, engine)
+    veic = pick_column(names, *DISP_COLUMNS["veic"])
+    if veic is None:
+        return pd.DataFrame(columns=names)
+    plate_at = names.index(veic)
+    value_at = [i for i in range(len(names)) if i != plate_at]
+
+    # Valores distintos por columna (clave -> valor crudo) y conteos por (placa, valor)
+    distinct: List[Dict[Hashable, object]] = [{} for _ in names]
+    counts: Dict[int, Dict[tuple, int]] = {i: {} for i in value_at}
+    rows = 0
+    for record in records:
+        rows += 1
+        keys = [_key(value) for value in record]
+        for seen, key, value in zip(distinct, keys, record):
+            if key not in seen:
+                seen[key] = value
+        plate = keys[plate_at]
+        if plate == _NONE:
+            continue
+        for i in value_at:
+            if record[i] is not None:
+                pair = (plate, keys[i])
+                column = counts[i]
+                column[pair] = column.get(pair, 0) + 1
+
+    plate_of = _normalized(distinct[plate_at])
+    plates = pd.unique(pd.Series([plate_of[key] for key in distinct[plate_at] if key != _NONE], dtype=object))
+    out = pd.DataFrame({veic: plates})
+    for i in value_at:
+        value_of = _normalized(distinct[i])
+        pairs = pd.DataFrame([(plate_of[p], value_of[v], n) for (p, v), n in counts[i].items()],
+                             columns=["veic", "value", "n"])
+        # Varios valores crudos pueden normalizarse igual: se suman en el orden del primero
+        totals = pairs.groupby(["veic", "value"], sort=False)["n"].sum()
+        out[names[i]] = modal_from_counts(totals, plates).to_numpy(dtype=object)
+    out = out[names]
+    out.attrs[ROWS_ATTR] = rows
+    return out
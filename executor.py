@@ -0,0 +1,132 @@
+"""
+Pool de workers para sacar el trabajo CPU (pandas/openpyxl) del event loop.
+
+Por defecto es un ProcessPoolExecutor (sin contención del GIL); si no se puede crear
+(p. ej. sin soporte de multiprocessing en el entorno) se usa un ThreadPoolExecutor.
+Además limita cuántos trabajos pueden estar en curso + en cola: si se supera, `run`
+levanta PoolSaturated en lugar de encolar sin límite.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PoolSaturated(Exception):
+    """Hay `max_workers` trabajos corriendo y la cola está llena."""
+
+
+class PoolUnavailable(Exception):
+    """El pool de procesos se rompió (p. ej. un worker murió por OOM); se recrea para el próximo."""
+
+
+class WorkerPool:
+    def __init__(self, kind: str = "process", max_workers: Optional[int] = None, max_queue: int = 4):
+        if kind not in ("process", "thread"):
+            raise ValueError(f"Tipo de pool desconocido: {kind}")
+        self.requested_kind = kind
+        self.kind = kind
+        self.max_workers = max_workers or min(2, os.cpu_count() or 1)
+        self.max_queue = max_queue
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._rejected = 0
+        self._completed = 0
+
+    # ---------- Ciclo de vida ----------
+    def start(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._create()
+
+    def _create(self) -> Executor:
+        if self.requested_kind == "process":
+            try:
+                # spawn: los workers no heredan hilos/estado del proceso web
+                executor = ProcessPoolExecutor(self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+                self.kind = "process"
+                return executor
+            except (OSError, NotImplementedError, ImportError):
+                logger.warning("No se pudo crear el pool de procesos; se usa un pool de hilos.", exc_info=True)
+        self.kind = "thread"
+        return ThreadPoolExecutor(self.max_workers, thread_name_prefix="pipeline")
+
+    async def prestart(self, fn: Callable, *args):
+        """
+        Corre `fn(*args)` (imports y pre-calentamiento) antes del primer request: en cada worker
+        del pool de procesos, lo que además los levanta sin esperar al primer submit, o una vez
+        en el pool de hilos (comparten el proceso). No cuenta en `stats`.
+        """
+        with self._lock:
+            executor = self._executor
+        if executor is None:
+            return
+        loop = asyncio.get_running_loop()
+        # Cada submit sin workers libres crea un proceso nuevo, hasta `max_workers`
+        times = self.max_workers if self.kind == "process" else 1
+        try:
+            await asyncio.gather(*(loop.run_in_executor(executor, partial(fn, *args)) for _ in range(times)))
+        except BrokenProcessPool:
+            self._discard(executor)
+            raise
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    # ---------- Ejecución ----------
+    @property
+    def capacity(self) -> int:
+        """Trabajos admitidos a la vez (corriendo + en cola)."""
+        return self.max_workers + self.max_queue
+
+    async def run(self, fn: Callable, *args, **kwargs):
+        """Ejecuta `fn(*args, **kwargs)` en el pool y espera el resultado sin bloquear el loop."""
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                self._rejected += 1
+                raise PoolSaturated()
+            self._in_flight += 1
+            if self._executor is None:
+                self._executor = self._create()
+            executor = self._executor
+
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(executor, partial(fn, *args, **kwargs))
+        except BrokenProcessPool as e:
+            self._discard(executor)
+            raise PoolUnavailable() from e
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                self._completed += 1
+
+    def _discard(self, executor: Executor):
+        """Saca un pool roto; el próximo `run` crea uno nuevo."""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "kind": self.kind,
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "running": min(self._in_flight, self.max_workers),
+                "queued": max(0, self._in_flight - self.max_workers),
+                "rejected": self._rejected,
+                "completed": self._completed,
+            }
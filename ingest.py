@@ -0,0 +1,381 @@
+"""
+Lectura de planillas XLSX en modo streaming.
+
+En lugar de `pd.read_excel` (que arma el modelo completo de openpyxl para todas las
+celdas), se resuelve primero la fila de encabezados con el mismo matcheo tolerante de
+`_pick_col` y luego se leen fila a fila SOLO las columnas necesarias.
+
+Motores:
+  * "calamine": si `python-calamine` está instalado (el más rápido).
+  * "xml": recorre el XML de la hoja con iterparse y decodifica solo las celdas pedidas.
+  * "openpyxl": openpyxl en modo read-only (más lento, para archivos raros).
+"""
+import io
+import posixpath
+import zipfile
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from xml.etree.ElementTree import iterparse
+
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format, is_timedelta_format
+from openpyxl.utils import column_index_from_string
+from openpyxl.utils.datetime import CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900, from_excel
+from pandas.io.parsers.readers import STR_NA_VALUES
+
+try:  # Motor opcional
+    import python_calamine  # noqa: F401
+    HAS_CALAMINE = True
+except ImportError:
+    HAS_CALAMINE = False
+
+
+# Alias de columnas por planilla (mismo orden de preferencia que en process_files)
+FLEET_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "placa":  ("PLACA", "DOMINIO", "PLATE", "PATENTE"),
+    "estado": ("ESTADO", "STATUS"),
+    "svc":    ("BASE",),
+    "mlp":    ("CENTRO DE CUSTOS", "CENTRO DE CUSTO"),
+}
+DISP_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "veic": ("VEÍCULO", "VEICULO", "VEHICULO", "DOMINIO", "PLACA", "PATENTE"),
+    "svc":  ("BASE",),
+    "mlp":  ("CENTRO DE CUSTOS", "CENTRO DE CUSTO"),
+}
+
+# (índice de columna, nombre real) de cada columna a leer, ordenadas por índice
+Targets = List[Tuple[int, str]]
+
+
+# ---------- Matcheo de encabezados ----------
+def normalize_key(s: str) -> str:
+    return (
+        str(s)
+        .strip()
+        .upper()
+        .replace("Á", "A").replace("É", "E").replace("Í", "I")
+        .replace("Ó", "O").replace("Ú", "U").replace("Ç", "C")
+    )
+
+def pick_column(columns: Iterable[str], *candidates: str) -> Optional[str]:
+    """Devuelve el nombre real de columna matcheando candidatos (case/acento/espacios insensible)."""
+    norm_map = {normalize_key(c): c for c in columns}
+    for cand in candidates:
+        k = normalize_key(cand)
+        if k in norm_map:
+            return norm_map[k]
+    return None
+
+def _header_names(raw: Sequence) -> List[str]:
+    """Nombres de encabezado como los deja pd.read_excel (+ strip): 'Unnamed: i' y duplicados '.N'."""
+    names: List[str] = []
+    seen: Dict[str, int] = {}
+    for i, value in enumerate(raw):
+        name = f"Unnamed: {i}" if value is None or str(value) == "" else str(value)
+        if name in seen:
+            seen[name] += 1
+            new = f"{name}.{seen[name]}"
+            while new in seen:
+                seen[name] += 1
+                new = f"{name}.{seen[name]}"
+            seen[new] = 0
+            name = new
+        else:
+            seen[name] = 0
+        names.append(name)
+    return [n.strip() for n in names]
+
+def resolve_columns(header: Sequence, columns: Dict[str, Tuple[str, ...]]) -> Dict[str, Tuple[int, str]]:
+    """Rol -> (índice, nombre real) para cada rol de `columns` presente en el encabezado."""
+    names = _header_names(header)
+    index = {name: i for i, name in enumerate(names)}
+    resolved = {}
+    for role, aliases in columns.items():
+        name = pick_column(names, *aliases)
+        if name is not None:
+            resolved[role] = (index[name], name)
+    return resolved
+
+
+# ---------- Conversión de celdas ----------
+def _rewind(source):
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(source)
+    if hasattr(source, "seek"):
+        source.seek(0)
+    return source
+
+def _convert(value):
+    # Igual que el lector openpyxl de pandas: floats enteros -> int, NA strings -> NaN
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str) and value in STR_NA_VALUES:
+        return None
+    return value
+
+def _is_empty(value) -> bool:
+    return value is None or value == ""
+
+def _records(width: int, rows: Iterator[Optional[list]]) -> Iterator[list]:
+    """Filas con los valores convertidos (None = fila vacía). Descarta las vacías finales, como pandas."""
+    pending = 0
+    for row in rows:
+        if row is None:
+            pending += 1
+            continue
+        if pending:
+            empty = [None] * width
+            for _ in range(pending):
+                yield empty
+            pending = 0
+        yield [_convert(value) for value in row]
+
+def _frame(targets: Targets, rows: Iterator[Optional[list]]) -> pd.DataFrame:
+    """Arma el DataFrame a partir de filas (None = fila vacía)."""
+    data: List[list] = [[] for _ in targets]
+    for record in _records(len(targets), rows):
+        for col, value in zip(data, record):
+            col.append(value)
+    names = [name for _, name in targets]
+    return pd.DataFrame(dict(zip(names, data)), columns=names)
+
+
+# ---------- Motor openpyxl (read-only) ----------
+def _iter_openpyxl(source, columns: Dict[str, Tuple[str, ...]]) -> Tuple[Targets, Iterator[Optional[list]]]:
+    wb = load_workbook(_rewind(source), read_only=True, data_only=True)
+    rows = wb.worksheets[0].iter_rows(values_only=True)
+    header = next(rows, None)
+    targets = sorted(resolve_columns(header or (), columns).values())
+
+    def body():
+        try:
+            for row in rows:
+                if all(_is_empty(v) for v in row):
+                    yield None
+                    continue
+                width = len(row)
+                yield [row[i] if i < width else None for i, _ in targets]
+        finally:
+            wb.close()
+
+    return targets, body()
+
+
+# ---------- Motor XML (iterparse sobre la hoja) ----------
+_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_NS_REL = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_NS_PKG = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+_ROW, _CELL, _V, _IS, _T, _R = (_NS + t for t in ("row", "c", "v", "is", "t", "r"))
+
+def _zip_target(base: str, target: str) -> str:
+    if target.startswith("/"):
+        return target.lstrip("/")
+    return posixpath.normpath(posixpath.join(posixpath.dirname(base), target))
+
+def _rich_text(el) -> str:
+    """Texto de un <si>/<is>: <t> directo o runs <r><t>, ignorando fonética (<rPh>)."""
+    parts = []
+    for child in el:
+        if child.tag == _T:
+            parts.append(child.text or "")
+        elif child.tag == _R:
+            t = child.find(_T)
+            if t is not None:
+                parts.append(t.text or "")
+    return "".join(parts)
+
+def _workbook_parts(z: zipfile.ZipFile) -> Tuple[str, Optional[str], Optional[str], bool]:
+    """(hoja 1, sharedStrings, styles, date1904) según workbook.xml y sus relaciones."""
+    wb_path = "xl/workbook.xml"
+    for _, el in iterparse(z.open("_rels/.rels")):
+        if el.tag == _NS_PKG + "Relationship" and el.get("Type", "").endswith("/officeDocument"):
+            wb_path = _zip_target("", el.get("Target"))
+    rels_path = posixpath.join(posixpath.dirname(wb_path), "_rels", posixpath.basename(wb_path) + ".rels")
+    rels, shared, styles = {}, None, None
+    for _, el in iterparse(z.open(rels_path)):
+        if el.tag != _NS_PKG + "Relationship":
+            continue
+        target = _zip_target(wb_path, el.get("Target"))
+        kind = el.get("Type", "")
+        rels[el.get("Id")] = target
+        if kind.endswith("/sharedStrings"):
+            shared = target
+        elif kind.endswith("/styles"):
+            styles = target
+    first_sheet, date1904 = None, False
+    for _, el in iterparse(z.open(wb_path)):
+        if el.tag == _NS + "workbookPr":
+            date1904 = el.get("date1904", "0").lower() in ("1", "true")
+        elif el.tag == _NS + "sheet" and first_sheet is None:
+            first_sheet = rels[el.get(_NS_REL + "id")]
+    return first_sheet, shared, styles, date1904
+
+def _shared_strings(z: zipfile.ZipFile, path: Optional[str]) -> List[str]:
+    strings: List[str] = []
+    if path and path in z.namelist():
+        for _, el in iterparse(z.open(path)):
+            if el.tag == _NS + "si":
+                strings.append(_rich_text(el))
+                el.clear()
+    return strings
+
+def _date_styles(z: zipfile.ZipFile, path: Optional[str]) -> Dict[int, bool]:
+    """Índice de estilo (cellXfs) -> True si es fecha, False si es duración. Solo estilos de fecha/hora."""
+    if not path or path not in z.namelist():
+        return {}
+    formats = dict(BUILTIN_FORMATS)
+    xfs: List[int] = []
+    in_cell_xfs = False
+    for event, el in iterparse(z.open(path), events=("start", "end")):
+        if el.tag == _NS + "numFmt" and event == "end":
+            formats[int(el.get("numFmtId"))] = el.get("formatCode", "")
+        elif el.tag == _NS + "cellXfs":
+            in_cell_xfs = event == "start"
+        elif el.tag == _NS + "xf" and in_cell_xfs and event == "start":
+            xfs.append(int(el.get("numFmtId", 0)))
+    styles = {}
+    for i, fmt_id in enumerate(xfs):
+        fmt = formats.get(fmt_id)
+        if fmt and is_date_format(fmt):
+            styles[i] = not is_timedelta_format(fmt)
+    return styles
+
+def _iter_xml(source, columns: Dict[str, Tuple[str, ...]]) -> Tuple[Targets, Iterator[Optional[list]]]:
+    z = zipfile.ZipFile(_rewind(source))
+    sheet, shared_path, styles_path, date1904 = _workbook_parts(z)
+    strings = _shared_strings(z, shared_path)
+    date_styles = _date_styles(z, styles_path)
+    epoch = CALENDAR_MAC_1904 if date1904 else CALENDAR_WINDOWS_1900
+    col_cache: Dict[str, int] = {}
+
+    def col_index(ref: str) -> int:
+        letters = ref.rstrip("0123456789")
+        idx = col_cache.get(letters)
+        if idx is None:
+            idx = col_cache[letters] = column_index_from_string(letters) - 1
+        return idx
+
+    def value_of(c):
+        kind = c.get("t", "n")
+        if kind == "inlineStr":
+            el = c.find(_IS)
+            return _rich_text(el) if el is not None else None
+        v = c.find(_V)
+        if v is None or v.text is None:
+            return None
+        text = v.text
+        if kind == "s":
+            return strings[int(text)]
+        if kind in ("str", "e"):
+            return text
+        if kind == "b":
+            return text == "1"
+        if kind == "d":
+            return pd.Timestamp(text).to_pydatetime()
+        num = float(text) if ("." in text or "E" in text or "e" in text) else int(text)
+        style = c.get("s")
+        if style is not None and int(style) in date_styles:
+            return from_excel(num, epoch, timedelta=not date_styles[int(style)])
+        return num
+
+    def rows():
+        parent = None
+        for event, el in iterparse(z.open(sheet), events=("start", "end")):
+            if event == "start":
+                if el.tag == _NS + "sheetData":
+                    parent = el
+                continue
+            if el.tag != _ROW:
+                continue
+            cells = {}
+            pos = -1
+            for c in el:
+                if c.tag != _CELL:
+                    continue
+                ref = c.get("r")
+                pos = col_index(ref) if ref else pos + 1
+                cells[pos] = c
+            yield int(el.get("r")) if el.get("r") else None, cells
+            if parent is not None:
+                parent.clear()
+
+    it = rows()
+    # Fila 1 = encabezado (las filas ausentes en el XML son filas vacías)
+    header_cells: Dict[int, object] = {}
+    first = next(it, None)
+    pending_first = None
+    if first is not None:
+        number, cells = first
+        if number is None or number == 1:
+            header_cells = cells
+        else:
+            pending_first = first
+    width = max(header_cells) + 1 if header_cells else 0
+    header = [value_of(header_cells[i]) if i in header_cells else None for i in range(width)]
+    targets = sorted(resolve_columns(header, columns).values())
+
+    def body():
+        last = 1
+        stream = it if pending_first is None else _chain(pending_first, it)
+        for number, cells in stream:
+            number = number if number is not None else last + 1
+            for _ in range(number - last - 1):
+                yield None
+            last = number
+            if all(_is_empty(value_of(c)) for c in cells.values()):
+                yield None
+                continue
+            yield [value_of(cells[i]) if i in cells else None for i, _ in targets]
+        z.close()
+
+    return targets, body()
+
+def _chain(first, rest):
+    yield first
+    yield from rest
+
+
+# ---------- Motor calamine ----------
+def _read_calamine(source, columns: Dict[str, Tuple[str, ...]]) -> pd.DataFrame:
+    header = pd.read_excel(_rewind(source), engine="calamine", nrows=1, header=None)
+    resolved = resolve_columns(list(header.iloc[0]) if len(header) else [], columns)
+    if not resolved:
+        return pd.DataFrame()
+    targets = sorted(resolved.values())
+    df = pd.read_excel(_rewind(source), engine="calamine", usecols=[i for i, _ in targets])
+    df.columns = [name for _, name in targets]
+    return df
+
+
+# ---------- API ----------
+def read_columns(source, columns: Dict[str, Tuple[str, ...]], engine: Optional[str] = None) -> pd.DataFrame:
+    """
+    Lee de la primera hoja SOLO las columnas que matchean los alias de `columns`.
+    `source` puede ser bytes o un archivo binario. Columnas con encabezados ya `strip()`eados,
+    mismos valores que `pd.read_excel` para esas columnas.
+    engine: None (calamine si está disponible, si no xml), "calamine", "xml" u "openpyxl".
+    """
+    if engine is None:
+        engine = "calamine" if HAS_CALAMINE else "xml"
+    if engine == "calamine":
+        return _read_calamine(source, columns)
+    if engine == "xml":
+        return _frame(*_iter_xml(source, columns))
+    if engine == "openpyxl":
+        return _frame(*_iter_openpyxl(source, columns))
+    raise ValueError(f"Motor de lectura desconocido: {engine}")
+
+
+def iter_records(source, columns: Dict[str, Tuple[str, ...]], engine: Optional[str] = None) -> Tuple[List[str], Iterator[list]]:
+    """
+    Como `read_columns` pero sin armar el DataFrame: (nombres de columna, iterador de filas con
+    los mismos valores que tendría cada columna). Para agregar planillas que no entran en memoria.
+    engine: "xml" (por defecto; calamine lee la hoja entera de una vez) u "openpyxl".
+    """
+    if engine is None or engine == "xml":
+        targets, rows = _iter_xml(source, columns)
+    elif engine == "openpyxl":
+        targets, rows = _iter_openpyxl(source, columns)
+    else:
+        raise ValueError(f"Motor de lectura desconocido: {engine}")
+    return [name for _, name in targets], _records(len(targets), rows)
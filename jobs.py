@@ -0,0 +1,104 @@
+"""
+Trabajos asíncronos de reconciliación (POST /jobs + polling de GET /jobs/{id}).
+
+Cada trabajo recorre las etapas del pipeline y registra etapa actual, porcentaje y
+tiempo de cada etapa. Los trabajos terminados se olvidan pasado el TTL.
+"""
+import asyncio
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from uuid import uuid4
+
+# (clave, etiqueta para el frontend, % al iniciar la etapa)
+STAGES: List[Tuple[str, str, int]] = [
+    ("parsing_fleet", "Lendo planilha da frota", 0),
+    ("parsing_disponibilidad", "Lendo planilha de disponibilidade", 35),
+    ("reconciling", "Reconciliando", 70),
+    ("writing_xlsx", "Gerando Excel", 85),
+]
+_STAGE_INFO = {key: (label, pct) for key, label, pct in STAGES}
+
+
+class Job:
+    def __init__(self):
+        self.id = str(uuid4())
+        self.status = "queued"          # queued | running | done | error
+        self.stage: Optional[str] = None
+        self.progress = 0
+        self.timings: Dict[str, float] = {}
+        self.result: Optional[dict] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+        self._stage_started: Optional[float] = None
+
+    def enter(self, stage: str):
+        """Cierra la etapa anterior (si hay) y arranca `stage`."""
+        self._close_stage()
+        self.status = "running"
+        self.stage = stage
+        self.progress = _STAGE_INFO[stage][1]
+        self._stage_started = time.perf_counter()
+
+    def finish(self, result: dict):
+        self._close_stage()
+        self.status, self.stage, self.progress = "done", None, 100
+        self.result = result
+        self.finished_at = time.time()
+
+    def fail(self, message: str):
+        self._close_stage()
+        self.status = "error"
+        self.error = message
+        self.finished_at = time.time()
+
+    def _close_stage(self):
+        if self.stage and self._stage_started is not None:
+            self.timings[self.stage] = round(time.perf_counter() - self._stage_started, 4)
+        self._stage_started = None
+
+    def to_dict(self) -> dict:
+        data = {
+            "id": self.id,
+            "status": self.status,
+            "stage": self.stage,
+            "stage_label": _STAGE_INFO[self.stage][0] if self.stage else None,
+            "progress": self.progress,
+            "timings": self.timings,
+        }
+        if self.result is not None:
+            data["result"] = self.result
+        if self.error is not None:
+            data["error"] = self.error
+        return data
+
+
+class JobRegistry:
+    def __init__(self, ttl_seconds: float = 1800):
+        self.ttl_seconds = ttl_seconds
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def create(self) -> Job:
+        job = Job()
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            self._prune()
+            return self._jobs.get(job_id)
+
+    def active(self) -> int:
+        """Trabajos sin terminar."""
+        with self._lock:
+            return sum(1 for j in self._jobs.values() if j.finished_at is None)
+
+    def _prune(self):
+        limit = time.time() - self.ttl_seconds
+        for job_id in [i for i, j in self._jobs.items() if j.finished_at is not None and j.finished_at < limit]:
+            del self._jobs[job_id]
@@ -1,64 +1,168 @@
-from fastapi import FastAPI, UploadFile, File, Request
-from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from fastapi import Body, FastAPI, UploadFile, File, Form, Query, Request
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
-import pandas as pd
-import io
+from starlette.background import BackgroundTask
+import os
 from datetime import datetime
+from typing import List, Optional
 from uuid import uuid4
-from typing import Dict, Optional, List
 
-app = FastAPI()
-app.mount("/static", StaticFiles(directory="static"), name="static")
+from batch import aggregate, batch_format, check_bundle, read_zip, reconcile_pair, write_batch
+from cache import LRUCache, digest
+from changes import FILTERS, ChangeList
+from executor import PoolSaturated, PoolUnavailable, WorkerPool
+from jobs import Job, JobRegistry
+from metrics import BYTES_BUCKETS, ROWS_BUCKETS, Counter, Histogram, profiled, render
+from pipeline import (PipelineError, build_indexed_update, load_fleet, output_sizes, parse_disponibilidad,
+                      run_pipeline, source_rows, warm_up, write_workbook)
+from snapshot import FleetSnapshot
+from store import ResultStore
+from template_registry import DEFAULT_TEMPLATE, TemplateRegistry
+from uploads import BodySizeLimit, Source, check_size, close_sources, open_upload
+from vehicle_index import VehicleIndex
+from writers import DEFAULT_BACKEND, XLSX_MEDIA_TYPE, format_info
 
 # --- Config ---
 TEMPLATE_PATH = "./Planilla-Modelo.xlsx"   # Debe existir en la raíz del proyecto
 SHEET_NAME = "Worksheet"                   # Si no existe, se usa la primera hoja
-download_store: Dict[str, io.BytesIO] = {}  # Token -> stream en memoria
-
-
-# ---------- Utilidades ----------
-def _normalize_key(s: str) -> str:
-    return (
-        str(s)
-        .strip()
-        .upper()
-        .replace("Á", "A").replace("É", "E").replace("Í", "I")
-        .replace("Ó", "O").replace("Ú", "U").replace("Ç", "C")
-    )
-
-def _pick_col(df: pd.DataFrame, *candidates: str) -> Optional[str]:
-    """Devuelve el nombre real de columna del DF matcheando candidatos (case/acento/espacios insensible)."""
-    norm_map = {_normalize_key(c): c for c in df.columns}
-    for cand in candidates:
-        k = _normalize_key(cand)
-        if k in norm_map:
-            return norm_map[k]
-    return None
-
-def _load_template_headers(template_path: str, sheet_name: Optional[str]) -> List[str]:
-    """Lee solo encabezados del template, intentando la hoja pedida y si no, la primera."""
-    xl = pd.ExcelFile(template_path)
-    target = sheet_name if (sheet_name and sheet_name in xl.sheet_names) else xl.sheet_names[0]
-    df_headers = pd.read_excel(template_path, sheet_name=target, nrows=0)
-    return list(df_headers.columns)
-
-def _find_template_col(template_cols: List[str], *names: str) -> Optional[str]:
-    """Encuentra el nombre REAL de columna del template por alias (case-insensible, acentos tolerantes)."""
-    m = {_normalize_key(c): c for c in template_cols}
-    for n in names:
-        key = _normalize_key(n)
-        if key in m:
-            return m[key]
-    return None
-
-def _most_frequent(series: pd.Series) -> Optional[str]:
-    """Devuelve la moda (valor más frecuente) no-nulo en formato str/upper/strip."""
-    if series is None:
-        return None
-    s = series.dropna().astype(str).str.upper().str.strip()
-    if s.empty:
-        return None
-    return s.value_counts().idxmax()
+INDEX_PATH = "templates/index.html"
+# Templates adicionales seleccionables por request: "nombre=ruta.xlsx,otro=ruta2.xlsx"
+EXTRA_TEMPLATES = os.environ.get("TEMPLATES", "")
+
+MB = 1024 * 1024
+STORE_MAX_MEMORY_MB = float(os.environ.get("STORE_MAX_MEMORY_MB", 64))      # Tope en RAM de resultados
+STORE_MAX_DISK_MB = float(os.environ.get("STORE_MAX_DISK_MB", 512))         # Tope de resultados volcados a disco
+STORE_SPILL_THRESHOLD_MB = float(os.environ.get("STORE_SPILL_THRESHOLD_MB", 8))  # Desde este tamaño van a disco
+STORE_TTL_SECONDS = float(os.environ.get("STORE_TTL_SECONDS", 1800))        # Vida de un token sin descargar
+
+WORKER_POOL = os.environ.get("WORKER_POOL", "process")                      # "process" o "thread"
+WORKER_MAX = int(os.environ.get("WORKER_MAX", 0)) or None                    # Procesamientos simultáneos
+WORKER_QUEUE = int(os.environ.get("WORKER_QUEUE", 4))                        # En espera; más allá -> 429
+WRITER_BACKEND = os.environ.get("WRITER_BACKEND", DEFAULT_BACKEND)         # Ver writers.py
+JOB_RETRY_SECONDS = 0.5                                                      # Espera de un job si el pool está lleno
+RESULT_CACHE_MB = float(os.environ.get("RESULT_CACHE_MB", 64))               # Resultados por hash de archivos
+RESULT_CACHE_ENTRIES = int(os.environ.get("RESULT_CACHE_ENTRIES", 32))
+FLEET_SNAPSHOT = os.environ.get("FLEET_SNAPSHOT") or None                   # Snapshot de la flota (.feather/.parquet/.pkl)
+PROFILE_REQUESTS = os.environ.get("PROFILE_REQUESTS", "0") == "1"           # Habilita `profile` en /process
+MAX_UPLOAD_MB = float(os.environ.get("MAX_UPLOAD_MB", 100))                 # Tope por archivo subido
+MAX_REQUEST_MB = float(os.environ.get("MAX_REQUEST_MB", 2 * MAX_UPLOAD_MB + 1))  # Tope del cuerpo completo
+MAX_UPLOAD_BYTES = int(MAX_UPLOAD_MB * MB)
+BATCH_MAX_TOTAL_MB = float(os.environ.get("BATCH_MAX_TOTAL_MB", 2 * MAX_UPLOAD_MB))  # Zip de /batch descomprimido
+BATCH_MAX_FILES = int(os.environ.get("BATCH_MAX_FILES", 64))                 # Planillas por zip de /batch
+STARTUP_WARMUP = os.environ.get("STARTUP_WARMUP", "1") == "1"               # Pre-calentar pipeline y workers
+VEHICLE_LOOKUP_MAX = int(os.environ.get("VEHICLE_LOOKUP_MAX", 10000))        # Placas por POST /vehicles/lookup
+RESULT_CHANGES_MB = float(os.environ.get("RESULT_CHANGES_MB", 32))             # Cambios retenidos por token (/results)
+CHANGES_PAGE_MAX = int(os.environ.get("CHANGES_PAGE_MAX", 500))               # Filas por página de /results/{token}/changes
+
+logger = logging.getLogger(__name__)
+
+# Token -> planilla generada (acotado, con TTL y volcado a disco)
+download_store = ResultStore(
+    max_memory_bytes=int(STORE_MAX_MEMORY_MB * MB),
+    max_disk_bytes=int(STORE_MAX_DISK_MB * MB),
+    ttl_seconds=STORE_TTL_SECONDS,
+    spill_threshold=int(STORE_SPILL_THRESHOLD_MB * MB),
+)
+# CPU pesado (pandas/openpyxl) fuera del event loop
+worker_pool = WorkerPool(WORKER_POOL, max_workers=WORKER_MAX, max_queue=WORKER_QUEUE)
+
+# (hash fleet, hash disponibilidad, versión del template, backend) -> resultado ya calculado
+result_cache = LRUCache(
+    max_entries=RESULT_CACHE_ENTRIES,
+    max_bytes=int(RESULT_CACHE_MB * MB),
+    sizeof=lambda result: len(result["workbook"]) + (result["changes"].nbytes if result["changes"] else 0),
+)
+
+# Token -> filas del resultado en forma compacta (/results/{token}/changes). Aparte del almacén
+# de descargas: siguen disponibles después de descargar el archivo (que retira el token).
+result_changes = LRUCache(
+    max_entries=256,
+    max_bytes=int(RESULT_CHANGES_MB * MB),
+    sizeof=lambda changes: changes.nbytes,
+)
+
+# Trabajos de /jobs (se olvidan junto con su token de descarga)
+jobs = JobRegistry(ttl_seconds=STORE_TTL_SECONDS)
+
+# Última flota + disponibilidad procesadas en el pool, indexadas por placa (/vehicles). Los
+# resultados servidos desde la caché no la reemplazan: no vuelven a leer las planillas.
+vehicle_index: Optional[VehicleIndex] = None
+
+# Métricas de /metrics
+STAGE_SECONDS = Histogram("zuco_stage_seconds", "Duración de cada etapa del pipeline.")
+REQUEST_SECONDS = Histogram("zuco_request_seconds", "Duración total de un procesamiento.")
+INPUT_ROWS = Histogram("zuco_input_rows", "Filas leídas por planilla.", ROWS_BUCKETS)
+OUTPUT_ROWS = Histogram("zuco_output_rows", "Filas de la planilla generada.", ROWS_BUCKETS)
+OUTPUT_BYTES = Histogram("zuco_output_bytes", "Tamaño de la planilla generada.", BYTES_BUCKETS)
+REQUESTS = Counter("zuco_requests_total", "Procesamientos por endpoint y resultado.")
+ERRORS = Counter("zuco_errors_total", "Errores inesperados por tipo de excepción.")
+METRICS = (STAGE_SECONDS, REQUEST_SECONDS, INPUT_ROWS, OUTPUT_ROWS, OUTPUT_BYTES, REQUESTS, ERRORS)
+
+# Templates parseados una vez al arrancar (se releen solo si cambia el archivo)
+templates = TemplateRegistry()
+templates.register(DEFAULT_TEMPLATE, TEMPLATE_PATH, SHEET_NAME)
+for item in filter(None, (x.strip() for x in EXTRA_TEMPLATES.split(","))):
+    name, _, path = item.partition("=")
+    templates.register(name.strip(), path.strip(), SHEET_NAME)
+
+
+# Segundos de cada paso del arranque (en /stats)
+startup = {}
+_index = {"mtime_ns": None, "html": ""}
+
+
+def _index_html() -> str:
+    """templates/index.html en memoria; se relee solo si cambia en disco."""
+    mtime_ns = os.stat(INDEX_PATH).st_mtime_ns
+    if _index["mtime_ns"] != mtime_ns:
+        with open(INDEX_PATH, "r", encoding="utf-8") as f:
+            _index.update(html=f.read(), mtime_ns=mtime_ns)
+    return _index["html"]
+
+
+def _load_static():
+    """Templates e index.html, una vez al arrancar."""
+    t0 = time.perf_counter()
+    templates.load_all()
+    _index_html()
+    startup["templates_seconds"] = round(time.perf_counter() - t0, 4)
+
+
+async def _warm_pool():
+    """
+    Un pipeline mínimo en los workers (ver `WorkerPool.prestart`), en segundo plano: el
+    arranque no se demora y el primer /process no paga el spawn ni las primeras llamadas.
+    """
+    t0 = time.perf_counter()
+    try:
+        await worker_pool.prestart(warm_up, _get_layout(DEFAULT_TEMPLATE), WRITER_BACKEND)
+        startup["warmup_seconds"] = round(time.perf_counter() - t0, 4)
+    except Exception:
+        # No impedir el arranque: el primer request simplemente llega en frío
+        logger.exception("Falló el pre-calentamiento del pool de workers")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Fuera del event loop: con boot.py /heartbeat sigue respondiendo mientras tanto
+    await asyncio.to_thread(_load_static)
+    download_store.start()
+    worker_pool.start()
+    warming = asyncio.create_task(_warm_pool()) if STARTUP_WARMUP else None
+    yield
+    if warming is not None:
+        warming.cancel()
+    worker_pool.shutdown()
+    download_store.stop()
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(BodySizeLimit, max_bytes=int(MAX_REQUEST_MB * MB))
+app.mount("/static", StaticFiles(directory="static"), name="static")
 
 
 # ---------- Rutas ----------
@@ -68,14 +172,160 @@ def root():
 
 @app.get("/", response_class=HTMLResponse)
 async def serve_index(request: Request):
-    with open("templates/index.html", "r", encoding="utf-8") as f:
-        return HTMLResponse(f.read())
+    return HTMLResponse(_index_html())
+
+
+# ---------- Helpers de procesamiento ----------
+def _get_layout(template: str):
+    """Plantilla (mismas columnas/orden), ya parseada en el registro."""
+    try:
+        layout = templates.get(template)
+    except KeyError:
+        raise PipelineError(f"Template desconhecido: {template}")
+    if not layout.dominio or not layout.estado:
+        raise PipelineError("El template debe incluir 'Dominio' y 'Estado'.", status_code=500)
+    # layout.base / layout.mlp pueden ser None; si no existen en el template, no se llenan.
+    return layout
+
+def _get_backend(fmt: str) -> str:
+    """Backend de escritura según el formato pedido: "xlsx" (WRITER_BACKEND) o "csv"."""
+    if fmt == "csv":
+        return "csv"
+    if fmt == "xlsx":
+        return WRITER_BACKEND
+    raise PipelineError(f"Formato desconhecido: {fmt}")
+
+def _download_filename(extension: str = "xlsx") -> str:
+    current_date = datetime.now().strftime("%d%m%Y")
+    return f"vehicle_fleet_update_{current_date}.{extension}"
+
+def _store_download(workbook, backend: str):
+    """Guarda el archivo con un token para descarga concurrente; devuelve (token, filename)."""
+    token = str(uuid4())
+    fmt = format_info(backend)
+    filename = _download_filename(fmt["extension"])
+    download_store.put(token, workbook, media_type=fmt["media_type"], filename=filename)
+    return token, filename
+
+def _publish(table_data, changes_summary, workbook, backend: str, fleet_diff: Optional[dict] = None,
+             changes: Optional[ChangeList] = None) -> dict:
+    """
+    Guarda la planilla con un token para descarga concurrente y arma la respuesta. Con
+    `changes`, sus filas quedan paginadas en /results/{token}/changes.
+    """
+    token, filename = _store_download(workbook, backend)
+    if changes is not None:
+        result_changes.put(token, changes)
+    response = {
+        "status": "success",
+        "table_data": table_data,
+        "filename": filename,
+        "token": token,
+        "changes_summary": changes_summary
+    }
+    if fleet_diff is not None:
+        response["fleet_diff"] = fleet_diff
+    return response
+
+async def _digests(*blobs: bytes):
+    """sha256 de cada upload, fuera del event loop (hashlib libera el GIL)."""
+    loop = asyncio.get_running_loop()
+    return await asyncio.gather(*(loop.run_in_executor(None, digest, b) for b in blobs))
+
+async def _open_uploads(fleet_file: Optional[UploadFile], disp_file: UploadFile):
+    """
+    Contenido de ambos uploads sin copias de más (ver uploads.py); valida tamaños antes de leer.
+    Quien los recibe los cierra con `close_sources`.
+    """
+    for upload in (fleet_file, disp_file):
+        if upload is not None:
+            check_size(upload, MAX_UPLOAD_BYTES)
+    shareable = worker_pool.kind == "thread"  # Un archivo abierto no cruza a otro proceso
+    fleet_data = await open_upload(fleet_file, MAX_UPLOAD_BYTES, shareable) if fleet_file is not None else None
+    try:
+        disp_data = await open_upload(disp_file, MAX_UPLOAD_BYTES, shareable)
+    except BaseException:
+        close_sources(fleet_data)
+        raise
+    return fleet_data, disp_data
+
+async def _upload_keys(fleet_data: Optional[Source], disp_data: Source):
+    """Hashes de los uploads; sin planilla de frota vale la del snapshot (FLEET_SNAPSHOT)."""
+    if fleet_data is not None:
+        return tuple(await _digests(fleet_data, disp_data))
+    if not FLEET_SNAPSHOT:
+        raise PipelineError("Envie a planilha de frota.")
+    (disp_key,) = await _digests(disp_data)
+    return FleetSnapshot(FLEET_SNAPSHOT).digest, disp_key
+
+def _cache_key(fleet_key: str, disp_key: str, layout, backend: str) -> tuple:
+    return (fleet_key, disp_key, layout.version, backend)
+
+def _remember(key: tuple, table_data, changes_summary, workbook, index: Optional[VehicleIndex] = None,
+              changes: Optional[ChangeList] = None, fleet_diff: Optional[dict] = None) -> bytes:
+    """
+    Guarda el resultado (con sus `changes` y `fleet_diff`) en la caché y devuelve la planilla
+    como bytes (inmutable, compartible). `index` pasa a ser el de /vehicles.
+    """
+    global vehicle_index
+    if index is not None:
+        vehicle_index = index
+    data = workbook.getvalue()
+    result_cache.put(key, {"table_data": table_data, "changes_summary": changes_summary, "workbook": data,
+                           "changes": changes, "fleet_diff": fleet_diff})
+    return data
+
+def _publish_cached(key: tuple, fleet_data: Optional[Source]):
+    """
+    Publica un resultado cacheado con un token nuevo; None si no está en caché o si hay que
+    pasar por `load_fleet`: con FLEET_SNAPSHOT, una planilla de frota distinta de la del
+    snapshot tiene que reemplazarlo (y dar su `fleet_diff`) aunque el resultado ya exista.
+    """
+    if fleet_data is not None and FLEET_SNAPSHOT and key[0] != FleetSnapshot(FLEET_SNAPSHOT).digest:
+        return None
+    cached = result_cache.get(key)
+    if cached is None:
+        return None
+    backend = key[-1]
+    # Con upload el snapshot ya es esta flota: sin cambios, como en `load_fleet`; sin upload, None
+    fleet_diff = cached["fleet_diff"]
+    if fleet_diff is not None:
+        fleet_diff = {name: 0 for name in fleet_diff} if fleet_data is not None else None
+    return {**_publish(cached["table_data"], cached["changes_summary"], cached["workbook"], backend,
+                       fleet_diff, cached["changes"]), "cached": True}
+
+def _observe(endpoint: str, timings: dict, sizes: dict, total: float):
+    """Registra tiempos por etapa, filas y bytes de un procesamiento terminado."""
+    for stage, seconds in timings.items():
+        STAGE_SECONDS.observe(seconds, stage=stage)
+    REQUEST_SECONDS.observe(total, endpoint=endpoint)
+    INPUT_ROWS.observe(sizes["fleet_rows"], file="fleet")
+    INPUT_ROWS.observe(sizes["disponibilidad_rows"], file="disponibilidad")
+    OUTPUT_ROWS.observe(sizes["output_rows"])
+    OUTPUT_BYTES.observe(sizes["output_bytes"])
+
+def _unexpected(endpoint: str, e: Exception):
+    """Error no previsto: traza completa al log y contador por tipo."""
+    logger.exception("Error inesperado en %s", endpoint)
+    ERRORS.inc(endpoint=endpoint, type=type(e).__name__)
+
+def _busy_response() -> JSONResponse:
+    return JSONResponse({"error": "Servidor ocupado processando outros arquivos. Tente novamente em instantes."},
+                        status_code=429, headers={"Retry-After": "10"})
+
+def _unavailable_response() -> JSONResponse:
+    return JSONResponse({"error": "Serviço de processamento indisponível. Tente novamente."},
+                        status_code=503, headers={"Retry-After": "5"})
 
 
 @app.post("/process")
 async def process_files(
-    fleet_file: UploadFile = File(...),
-    disponibilidad_file: UploadFile = File(...)
+    fleet_file: Optional[UploadFile] = File(None),
+    disponibilidad_file: UploadFile = File(...),
+    template: str = Form(DEFAULT_TEMPLATE),
+    output_format: str = Form("xlsx"),
+    timings: bool = Form(False),
+    profile: bool = Form(False)
 ):
     """
     - Lee fleet-moviles y disponibilidad
@@ -83,196 +333,323 @@ async def process_files(
       * SVC (Base): si fleet != disponibilidad, actualizar
       * MLP (Centro de Custos): si fleet != disponibilidad, actualizar
     - Una fila por patente combinando cambios de Estado/SVC/MLP
-    - Excel respeta estructura del template y se guarda en memoria con token
+    - Excel respeta estructura del template (`template`: nombre registrado) y se guarda con token
+    - `output_format`: "xlsx" (default) o "csv"
+    - Sin `fleet_file` se usa el snapshot de la flota (FLEET_SNAPSHOT); con snapshot, la
+      respuesta incluye `fleet_diff` (placas agregadas/quitadas/cambiadas desde el anterior)
+    - `timings`: agrega segundos por etapa (`timings`) y filas/bytes (`sizes`) a la respuesta
+    - `profile` (con PROFILE_REQUESTS=1): corre con cProfile, sin caché, y devuelve el resumen
     """
+    started = time.perf_counter()
+    fleet_data = disp_data = None
+    try:
+        layout = _get_layout(template)
+        backend = _get_backend(output_format)
+        if profile and not PROFILE_REQUESTS:
+            raise PipelineError("Profiling desabilitado (PROFILE_REQUESTS=1).", status_code=403)
+
+        fleet_data, disp_data = await _open_uploads(fleet_file, disponibilidad_file)
+
+        # Mismos archivos + mismo template/formato -> resultado ya calculado
+        fleet_key, disp_key = await _upload_keys(fleet_data, disp_data)
+        key = _cache_key(fleet_key, disp_key, layout, backend)
+        cached = _publish_cached(key, fleet_data) if not profile else None
+        if cached is not None:
+            REQUESTS.inc(endpoint="process", outcome="cached")
+            return cached
+
+        # Lectura + reglas + Excel fuera del event loop
+        args = (run_pipeline, fleet_data, disp_data, layout, backend, fleet_key, disp_key, FLEET_SNAPSHOT, True)
+        if profile:
+            result, profile_text = await worker_pool.run(profiled, *args)
+        else:
+            result = await worker_pool.run(*args)
+        close_sources(fleet_data, disp_data)
+        fleet_data = disp_data = None
+        total = time.perf_counter() - started
+        _observe("process", result["timings"], result["sizes"], total)
+        REQUESTS.inc(endpoint="process", outcome="ok")
+
+        workbook = _remember(key, result["table_data"], result["changes_summary"], result["workbook"],
+                             result["vehicle_index"], result["changes"], result["fleet_diff"])
+        response = _publish(result["table_data"], result["changes_summary"], workbook, backend, result["fleet_diff"],
+                            result["changes"])
+        if timings:
+            response["timings"] = {**result["timings"], "total": round(total, 4)}
+            response["sizes"] = result["sizes"]
+        if profile:
+            response["profile"] = profile_text
+        return response
+
+    except PipelineError as e:
+        REQUESTS.inc(endpoint="process", outcome="invalid")
+        return JSONResponse({"error": e.message}, status_code=e.status_code)
+    except PoolSaturated:
+        REQUESTS.inc(endpoint="process", outcome="busy")
+        return _busy_response()
+    except PoolUnavailable:
+        REQUESTS.inc(endpoint="process", outcome="unavailable")
+        return _unavailable_response()
+    except Exception as e:
+        REQUESTS.inc(endpoint="process", outcome="error")
+        _unexpected("process", e)
+        return JSONResponse({"error": str(e)}, status_code=500)
+    finally:
+        close_sources(fleet_data, disp_data)
+
+
+# ---------- Trabajos asíncronos (polling) ----------
+async def _pool_stage(fn, *args):
+    """Corre una etapa en el pool; si está saturado espera su turno en lugar de fallar."""
+    while True:
+        try:
+            return await worker_pool.run(fn, *args)
+        except PoolSaturated:
+            await asyncio.sleep(JOB_RETRY_SECONDS)
+
+async def _run_job(job: Job, fleet_data: Optional[Source], disp_data: Source, layout, backend: str, key: tuple):
+    try:
+        fleet_key, disp_key = key[:2]
+        job.enter("parsing_fleet")
+        fleet, fleet_diff = await _pool_stage(load_fleet, fleet_data, fleet_key, FLEET_SNAPSHOT)
+        close_sources(fleet_data)
+        fleet_data = None
+        job.enter("parsing_disponibilidad")
+        disp = await _pool_stage(parse_disponibilidad, disp_data, disp_key)
+        close_sources(disp_data)
+        disp_data = None
+        job.enter("reconciling")
+        output_df, changes_summary, table_data, index = await _pool_stage(build_indexed_update, fleet, disp, layout)
+        input_rows = len(fleet[0]), source_rows(disp[0])
+        del fleet, disp
+        job.enter("writing_xlsx")
+        workbook, changes = await asyncio.gather(
+            _pool_stage(write_workbook, output_df, layout.sheet_name, backend),
+            asyncio.to_thread(ChangeList.build, output_df, layout.tpl_cols))
+        sizes = output_sizes(*input_rows, output_df, workbook)
+        workbook = _remember(key, table_data, changes_summary, workbook, index, changes, fleet_diff)
+        job.finish(_publish(table_data, changes_summary, workbook, backend, fleet_diff, changes))
+        _observe("jobs", job.timings, sizes, job.finished_at - job.created_at)
+        REQUESTS.inc(endpoint="jobs", outcome="ok")
+    except PipelineError as e:
+        REQUESTS.inc(endpoint="jobs", outcome="invalid")
+        job.fail(e.message)
+    except PoolUnavailable:
+        REQUESTS.inc(endpoint="jobs", outcome="unavailable")
+        job.fail("Serviço de processamento indisponível. Tente novamente.")
+    except Exception as e:
+        REQUESTS.inc(endpoint="jobs", outcome="error")
+        _unexpected("jobs", e)
+        job.fail(str(e))
+    finally:
+        close_sources(fleet_data, disp_data)
+
+
+@app.post("/jobs")
+async def create_job(
+    fleet_file: Optional[UploadFile] = File(None),
+    disponibilidad_file: UploadFile = File(...),
+    template: str = Form(DEFAULT_TEMPLATE),
+    output_format: str = Form("xlsx")
+):
+    """Igual que /process pero responde enseguida con un id; el avance se consulta en /jobs/{id}."""
     try:
-        fleet_bytes = await fleet_file.read()
-        disp_bytes  = await disponibilidad_file.read()
-
-        fleet_df = pd.read_excel(io.BytesIO(fleet_bytes))
-        disp_df  = pd.read_excel(io.BytesIO(disp_bytes))
-
-        # Normalizar encabezados (conservar nombres reales, pero usaremos búsqueda tolerante)
-        fleet_df.columns = fleet_df.columns.str.strip()
-        disp_df.columns  = disp_df.columns.str.strip()
-
-        # Identificadores de vehículo
-        placa_col   = _pick_col(fleet_df, "PLACA", "DOMINIO", "PLATE", "PATENTE")
-        veic_col    = _pick_col(disp_df,  "VEÍCULO", "VEICULO", "VEHICULO", "DOMINIO", "PLACA", "PATENTE")
-
-        # Estado
-        estado_col  = _pick_col(fleet_df, "ESTADO", "STATUS")
-
-        # SVC (Base) y MLP (Centro de Custos) en ambas planillas
-        svc_fleet_col = _pick_col(fleet_df, "BASE")  # Col C en fleet
-        mlp_fleet_col = _pick_col(fleet_df, "CENTRO DE CUSTOS", "CENTRO DE CUSTO")  # Col T en fleet
-
-        svc_disp_col = _pick_col(disp_df, "BASE")  # Col E en disponibilidad
-        mlp_disp_col = _pick_col(disp_df, "CENTRO DE CUSTOS", "CENTRO DE CUSTO")  # Col I en disponibilidad
-
-        # Validaciones mínimas
-        if not placa_col:
-            return JSONResponse({"error": "Não encontrei a coluna de PLACA/DOMINIO na planilha de frota."}, status_code=400)
-        if not veic_col:
-            return JSONResponse({"error": "Não encontrei a coluna de VEÍCULO/VEICULO/PLACA na planilha de disponibilidade."}, status_code=400)
-
-        # Normalizaciones comunes
-        fleet_df[placa_col] = fleet_df[placa_col].astype(str).str.upper().str.strip()
-        disp_df[veic_col]   = disp_df[veic_col].astype(str).str.upper().str.strip()
-
-        if estado_col and estado_col in fleet_df.columns:
-            fleet_df[estado_col] = fleet_df[estado_col].astype(str).str.upper().str.strip()
-
-        if svc_fleet_col and svc_fleet_col in fleet_df.columns:
-            fleet_df[svc_fleet_col] = fleet_df[svc_fleet_col].astype(str).str.upper().str.strip()
-        if mlp_fleet_col and mlp_fleet_col in fleet_df.columns:
-            fleet_df[mlp_fleet_col] = fleet_df[mlp_fleet_col].astype(str).str.upper().str.strip()
-
-        if svc_disp_col and svc_disp_col in disp_df.columns:
-            disp_df[svc_disp_col] = disp_df[svc_disp_col].astype(str).str.upper().str.strip()
-        if mlp_disp_col and mlp_disp_col in disp_df.columns:
-            disp_df[mlp_disp_col] = disp_df[mlp_disp_col].astype(str).str.upper().str.strip()
-
-        # --- Reglas de ESTADO (existentes) ---
-        activos = set()
-        ociosos = set()
-        if estado_col and estado_col in fleet_df.columns:
-            activos = set(fleet_df[fleet_df[estado_col] == 'ATIVO - BIPANDO'][placa_col])
-            ociosos = set(fleet_df[fleet_df[estado_col] == 'FROTA OCIOSA'][placa_col])
-
-        # Este set se usaba para inferir "debería ser ocioso/activo" (mantener)
-        disp_set = set(disp_df[veic_col].dropna())
-
-        activos_deberian_ser_ociosos = activos & disp_set       # están ativos pero deberían ser ociosos
-        ociosos_deberian_ser_activos = ociosos - disp_set       # están ociosos pero deberían ser ativos
-
-        # --- Reglas NUEVAS: SVC/MLP objetivo desde disponibilidad (moda por patente) ---
-        svc_target_map = {}
-        mlp_target_map = {}
-        if svc_disp_col and svc_disp_col in disp_df.columns:
-            svc_target_map = disp_df.groupby(veic_col)[svc_disp_col].apply(_most_frequent).to_dict()
-        if mlp_disp_col and mlp_disp_col in disp_df.columns:
-            mlp_target_map = disp_df.groupby(veic_col)[mlp_disp_col].apply(_most_frequent).to_dict()
-
-        # Valores actuales en flota
-        svc_current_map = {}
-        mlp_current_map = {}
-        if svc_fleet_col and svc_fleet_col in fleet_df.columns:
-            svc_current_map = fleet_df.set_index(placa_col)[svc_fleet_col].to_dict()
-        if mlp_fleet_col and mlp_fleet_col in fleet_df.columns:
-            mlp_current_map = fleet_df.set_index(placa_col)[mlp_fleet_col].to_dict()
-
-        # --- Plantilla (mismas columnas/orden) ---
-        template_cols = _load_template_headers(TEMPLATE_PATH, SHEET_NAME)
-
-        dominio_tpl = _find_template_col(template_cols, "Dominio", "Placa", "Patente", "DOMINIO")
-        estado_tpl  = _find_template_col(template_cols, "Estado", "STATUS", "ESTADO")
-        base_tpl    = _find_template_col(template_cols, "Base")  # SVC
-        mlp_tpl     = _find_template_col(template_cols, "Centro de Custos", "Centro de Custo")
-
-        if not dominio_tpl or not estado_tpl:
-            return JSONResponse({"error": "El template debe incluir 'Dominio' y 'Estado'."}, status_code=500)
-        # base_tpl / mlp_tpl pueden ser None; si no existen en el template, no se llenan.
-
-        # Construcción: una fila por patente con todos los cambios
-        changes_summary = {"svc_changes": 0, "mlp_changes": 0, "estado_changes": 0, "both_changes": 0, "total_rows": 0}
-        rows_by_plate: Dict[str, dict] = {}
-
-        def ensure_row(plate: str) -> dict:
-            if plate not in rows_by_plate:
-                rows_by_plate[plate] = {col: "" for col in template_cols}
-                rows_by_plate[plate][dominio_tpl] = plate
-            return rows_by_plate[plate]
-
-        # Cambios de ESTADO (regla original)
-        for plate in sorted(activos_deberian_ser_ociosos):
-            row = ensure_row(plate)
-            row[estado_tpl] = 'FROTA OCIOSA'
-            changes_summary["estado_changes"] += 1
-        for plate in sorted(ociosos_deberian_ser_activos):
-            row = ensure_row(plate)
-            row[estado_tpl] = 'ATIVO - BIPANDO'
-            changes_summary["estado_changes"] += 1
-
-        # Cambios de SVC/MLP (comparación directa fleet vs disponibilidad)
-        for plate in fleet_df[placa_col].unique():
-            svc_tgt = svc_target_map.get(plate)
-            mlp_tgt = mlp_target_map.get(plate)
-            svc_cur = svc_current_map.get(plate)
-            mlp_cur = mlp_current_map.get(plate)
-
-            svc_changed = False
-            mlp_changed = False
-
-            if base_tpl and svc_tgt and svc_tgt != (svc_cur or ""):
-                row = ensure_row(plate)
-                row[base_tpl] = svc_tgt
-                svc_changed = True
-
-            if mlp_tpl and mlp_tgt and mlp_tgt != (mlp_cur or ""):
-                row = ensure_row(plate)
-                row[mlp_tpl] = mlp_tgt
-                mlp_changed = True
-
-            if svc_changed and mlp_changed:
-                changes_summary["both_changes"] += 1
-            if svc_changed:
-                changes_summary["svc_changes"] += 1
-            if mlp_changed:
-                changes_summary["mlp_changes"] += 1
-
-        # DataFrame final
-        output_rows = list(rows_by_plate.values())
-        output_df = pd.DataFrame(output_rows, columns=template_cols)
-        changes_summary["total_rows"] = len(output_df)
-
-        # Resumen por Estado (para tabla del frontend)
-        total_flota = len(fleet_df)
-        estado_counts = {}
-        estado_pct = {}
-        if estado_col and total_flota:
-            estado_counts = fleet_df[estado_col].value_counts().to_dict()
-            estado_pct = {k: round(v * 100 / total_flota, 2) for k, v in estado_counts.items()}
-        table_data = [{"Estado": k, "Cantidad": v, "Porcentaje": estado_pct.get(k, 0)} for k, v in estado_counts.items()]
-
-        # Excel en memoria (openpyxl)
-        excel_stream = io.BytesIO()
-        with pd.ExcelWriter(excel_stream, engine="openpyxl") as writer:
-            sheet_name = SHEET_NAME if SHEET_NAME else "Worksheet"
-            output_df.to_excel(writer, index=False, sheet_name=sheet_name)
-        excel_stream.seek(0)
-
-        # Token para descarga concurrente
-        token = str(uuid4())
-        download_store[token] = excel_stream
-
-        current_date = datetime.now().strftime("%d%m%Y")
-        filename = f"vehicle_fleet_update_{current_date}.xlsx"
+        layout = _get_layout(template)
+        backend = _get_backend(output_format)
+    except PipelineError as e:
+        return JSONResponse({"error": e.message}, status_code=e.status_code)
 
+    try:
+        fleet_data, disp_data = await _open_uploads(fleet_file, disponibilidad_file)
+    except PipelineError as e:
+        return JSONResponse({"error": e.message}, status_code=e.status_code)
+    handed_off = False  # Los uploads pasan a _run_job, que los cierra
+    try:
+        try:
+            fleet_key, disp_key = await _upload_keys(fleet_data, disp_data)
+        except PipelineError as e:
+            return JSONResponse({"error": e.message}, status_code=e.status_code)
+        key = _cache_key(fleet_key, disp_key, layout, backend)
+
+        # En caché: el trabajo nace terminado, sin ocupar el pool
+        cached = _publish_cached(key, fleet_data)
+        if cached is not None:
+            REQUESTS.inc(endpoint="jobs", outcome="cached")
+            job = jobs.create()
+            job.finish(cached)
+            return JSONResponse(job.to_dict(), status_code=202)
+
+        if jobs.active() >= worker_pool.capacity:
+            REQUESTS.inc(endpoint="jobs", outcome="busy")
+            return _busy_response()
+        job = jobs.create()
+        job.task = asyncio.create_task(_run_job(job, fleet_data, disp_data, layout, backend, key))
+        handed_off = True
+        return JSONResponse(job.to_dict(), status_code=202)
+    finally:
+        if not handed_off:
+            close_sources(fleet_data, disp_data)
+
+
+@app.post("/batch")
+async def process_batch(
+    batch_file: UploadFile = File(...),
+    template: str = Form(DEFAULT_TEMPLATE),
+    output_format: str = Form("xlsx"),
+    bundle: str = Form("sheets")
+):
+    """
+    Varias regiones en un zip (ver batch.py): cada par fleet + disponibilidad se reconcilia en
+    el pool, en paralelo, con el template parseado una sola vez.
+    - `bundle`: "sheets" (un libro con una hoja por región) o "zip" (un archivo por región)
+    - Responde `changes_summary` sumado, `regions` (resumen y tabla por región) y el token
+    """
+    started = time.perf_counter()
+    try:
+        layout = _get_layout(template)
+        backend = _get_backend(output_format)
+        check_bundle(backend, bundle)
+        check_size(batch_file, MAX_UPLOAD_BYTES)
+        data = await open_upload(batch_file, MAX_UPLOAD_BYTES)
+        try:
+            loop = asyncio.get_running_loop()
+            pairs = await loop.run_in_executor(None, read_zip, data, MAX_UPLOAD_BYTES,
+                                               int(BATCH_MAX_TOTAL_MB * MB), BATCH_MAX_FILES)
+        finally:
+            close_sources(data)
+        del data
+
+        regions = list(pairs)
+        results = await asyncio.gather(*(_pool_stage(reconcile_pair, *pairs.pop(r), layout) for r in regions))
+        workbook = await _pool_stage(write_batch, {r: df for r, (df, _, _) in zip(regions, results)},
+                                     layout.sheet_name, backend, bundle)
+        token, filename = _store_download(workbook, batch_format(backend, bundle))
+        REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint="batch")
+        REQUESTS.inc(endpoint="batch", outcome="ok")
         return {
             "status": "success",
-            "table_data": table_data,
+            "regions": {r: {"changes_summary": summary, "table_data": table}
+                        for r, (_, summary, table) in zip(regions, results)},
+            "changes_summary": aggregate(summary for _, summary, _ in results),
             "filename": filename,
             "token": token,
-            "changes_summary": changes_summary
         }
 
+    except PipelineError as e:
+        REQUESTS.inc(endpoint="batch", outcome="invalid")
+        return JSONResponse({"error": e.message}, status_code=e.status_code)
+    except PoolUnavailable:
+        REQUESTS.inc(endpoint="batch", outcome="unavailable")
+        return _unavailable_response()
     except Exception as e:
+        REQUESTS.inc(endpoint="batch", outcome="error")
+        _unexpected("batch", e)
         return JSONResponse({"error": str(e)}, status_code=500)
 
 
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Etapa, porcentaje y tiempos; al terminar incluye `result` (mismo formato que /process)."""
+    job = jobs.get(job_id)
+    if job is None:
+        return JSONResponse({"error": "Processamento não encontrado."}, status_code=404)
+    return job.to_dict()
+
+
 @app.get("/download/{token}")
 async def download_excel(token: str):
-    stream = download_store.pop(token, None)
-    if stream is None:
+    entry = download_store.pop(token)
+    if entry is None:
         return JSONResponse({"error": "Arquivo não disponível para download."}, status_code=400)
 
-    current_date = datetime.now().strftime("%d%m%Y")
-    filename = f"vehicle_fleet_update_{current_date}.xlsx"
+    filename = entry.filename or _download_filename()
+    media_type = entry.media_type or XLSX_MEDIA_TYPE
+
+    # Resultado volcado a disco: se sirve el archivo y se borra al terminar la respuesta
+    if entry.on_disk:
+        return FileResponse(entry.path, media_type=media_type, filename=filename,
+                            background=BackgroundTask(entry.discard))
 
-    stream.seek(0)
+    entry.stream.seek(0)
     return StreamingResponse(
-        stream,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        entry.stream,
+        media_type=media_type,
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
+
+
+# ---------- Cambios de un resultado ----------
+@app.get("/results/{token}/changes")
+def result_changes_page(token: str, page: int = 1, page_size: int = 50, kind: str = Query("all", alias="filter")):
+    """
+    Filas de la planilla de un resultado (`token` de /process o /jobs), paginadas, sin volver a
+    generar ni leer el archivo. `filter`: all, estado, svc o mlp (filas que actualizan ese campo).
+    Incluye `counts` (filas por filtro) para armar la vista.
+    """
+    try:
+        changes = result_changes.get(token)
+        if changes is None:
+            raise PipelineError("Resultado não encontrado ou expirado.", status_code=404)
+        if kind not in FILTERS:
+            raise PipelineError(f"Filtro desconhecido: {kind} (use {', '.join(FILTERS)}).")
+        if page < 1 or not 1 <= page_size <= CHANGES_PAGE_MAX:
+            raise PipelineError(f"Página inválida (page >= 1, page_size de 1 a {CHANGES_PAGE_MAX}).")
+    except PipelineError as e:
+        return JSONResponse({"error": e.message}, status_code=e.status_code)
+    return {"token": token, **changes.page(kind, page, page_size), "counts": changes.counts()}
+
+
+# ---------- Consulta por placa ----------
+def _vehicle_index() -> VehicleIndex:
+    if vehicle_index is None:
+        raise PipelineError("Nenhuma planilha processada ainda; envie os arquivos em /process.", status_code=404)
+    return vehicle_index
+
+@app.get("/vehicles/{plate}")
+def get_vehicle(plate: str):
+    """
+    Estado / Base (svc) / Centro de Custos (mlp) de la placa en la última flota procesada, la
+    moda de disponibilidad (`*_target`) y lo que /process actualizaría (`updates`).
+    """
+    try:
+        index = _vehicle_index()
+    except PipelineError as e:
+        return JSONResponse({"error": e.message}, status_code=e.status_code)
+    record = index.lookup(plate)
+    if record is None:
+        return JSONResponse({"error": f"Placa {plate} não encontrada."}, status_code=404)
+    return {**record, "indexed_at": index.built_at}
+
+@app.post("/vehicles/lookup")
+def lookup_vehicles(plates: List[str] = Body(..., embed=True)):
+    """Varias placas: {"plates": [...]} -> {"vehicles": {placa: datos o null}, "missing": [...]}."""
+    try:
+        index = _vehicle_index()
+        if len(plates) > VEHICLE_LOOKUP_MAX:
+            raise PipelineError(f"Máximo de {VEHICLE_LOOKUP_MAX} placas por consulta.", status_code=413)
+    except PipelineError as e:
+        return JSONResponse({"error": e.message}, status_code=e.status_code)
+    results = index.lookup_many(plates)
+    return {"vehicles": results, "missing": [plate for plate, record in results.items() if record is None],
+            "indexed_at": index.built_at}
+
+
+@app.get("/stats")
+def stats():
+    """Contadores del almacén de descargas (hits/misses/desalojos y bytes residentes), del pool, de la caché y tiempos del arranque."""
+    return {"download_store": download_store.stats(), "worker_pool": worker_pool.stats(),
+            "result_cache": result_cache.stats(), "result_changes": result_changes.stats(), "startup": startup,
+            "vehicle_index": vehicle_index.stats() if vehicle_index is not None else None}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Histogramas por etapa / filas / bytes y contadores, en formato de texto de Prometheus."""
+    gauges = {}
+    for prefix, values in (("zuco_download_store", download_store.stats()), ("zuco_worker_pool", worker_pool.stats()),
+                           ("zuco_result_cache", result_cache.stats()), ("zuco_result_changes", result_changes.stats()),
+                           ("zuco_vehicle_index", vehicle_index.stats() if vehicle_index is not None else {})):
+        for name, value in values.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                gauges[f"{prefix}_{name}"] = value
+    return PlainTextResponse(render(METRICS, gauges), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,119 @@
+"""
+Instrumentación del pipeline: tiempos por etapa, filas de entrada/salida y bytes generados.
+
+- `StageTimer` mide etapas dentro del pipeline (también en los workers del pool: los
+  tiempos vuelven en el resultado y se registran en el proceso principal).
+- `Histogram` / `Counter` son métricas mínimas al estilo Prometheus y `render` las
+  serializa en el formato de texto que lee Prometheus (GET /metrics).
+- `profiled` corre una función bajo cProfile y devuelve el resumen en texto.
+"""
+import cProfile
+import io
+import pstats
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+ROWS_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000)
+BYTES_BUCKETS = (10_000, 100_000, 1_000_000, 10_000_000, 100_000_000)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class StageTimer:
+    """Acumula la duración (segundos) de cada etapa por nombre."""
+
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = round(time.perf_counter() - started, 4)
+
+
+def profiled(fn, *args, **kwargs) -> Tuple[object, str]:
+    """Ejecuta `fn` con cProfile; devuelve (resultado, top 40 por tiempo acumulado)."""
+    profiler = cProfile.Profile()
+    result = profiler.runcall(fn, *args, **kwargs)
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(40)
+    return result, out.getvalue()
+
+
+def _labels(labels: Dict[str, str]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(labels: Iterable[Tuple[str, str]]) -> str:
+    items = ",".join(f'{k}="{v}"' for k, v in labels)
+    return "{" + items + "}" if items else ""
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = _labels(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float] = SECONDS_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self._series: Dict[Labels, list] = {}  # labels -> [conteo por bucket..., +Inf, suma]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str):
+        key = _labels(labels)
+        with self._lock:
+            series = self._series.setdefault(key, [0] * (len(self.buckets) + 1) + [0.0])
+            series[bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else _format_value(bound)
+                    lines.append(f"{self.name}_bucket{_format_labels(key + (('le', le),))} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(series[-1])}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {cumulative}")
+        return lines
+
+
+def render(metrics: Iterable, gauges: Optional[Dict[str, float]] = None) -> str:
+    """Texto de exposición de Prometheus; `gauges`: valores instantáneos nombre -> valor."""
+    lines: List[str] = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    for name, value in (gauges or {}).items():
+        lines.extend([f"# TYPE {name} gauge", f"{name} {_format_value(value)}"])
+    return "\n".join(lines) + "\n"
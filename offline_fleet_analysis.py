@@ -1,74 +1,169 @@
-import pandas as pd
-
-# Cargar archivos
-fleet_df = pd.read_excel("fleet-moviles.xlsx")
-disponibilidad_df = pd.read_excel("disponibilidad.xlsx")
-modelo_df = pd.read_excel("Planilla-Modelo.xlsx")
-
-# Filtrar columnas relevantes y normalizar
-fleet_filtered = fleet_df[['Placa', 'Estado']].copy()
-fleet_filtered['Placa'] = fleet_filtered['Placa'].astype(str).str.upper().str.strip()
-
-# Placas en disponibilidad (ociosas)
-disponibilidad_placas = disponibilidad_df['Veículo'].astype(str).str.upper().str.strip().unique()
-
-# -------- Lógica de comparación --------
-
-# Condición A: figura como "ATIVO - BIPANDO" pero también aparece en disponibilidad → debería ser "FROTA OCIOSA"
-cond_a = fleet_filtered[
-    (fleet_filtered['Estado'] == "ATIVO - BIPANDO") &
-    (fleet_filtered['Placa'].isin(disponibilidad_placas))
-].copy()
-cond_a['Estado'] = "FROTA OCIOSA"
-
-# Condición B: figura como "FROTA OCIOSA" pero NO aparece en disponibilidad → debería ser "ATIVO - BIPANDO"
-cond_b = fleet_filtered[
-    (fleet_filtered['Estado'] == "FROTA OCIOSA") &
-    (~fleet_filtered['Placa'].isin(disponibilidad_placas))
-].copy()
-cond_b['Estado'] = "ATIVO - BIPANDO"
-
-# Combinar ambos
-result_df = pd.concat([cond_a, cond_b], ignore_index=True)
-
-# Crear archivo con formato de modelo
-output_df = modelo_df.iloc[0:0].copy()
-output_df['Dominio'] = result_df['Placa'].values
-output_df['Estado'] = result_df['Estado'].values
-
-# Guardar resultado Excel
-output_df.to_excel("Vehiculos_para_actualizar_estado.xlsx", index=False)
-
-# -------- Resultados informativos --------
-total_flota = fleet_filtered.shape[0]
-errores_a = cond_a.shape[0]
-errores_b = cond_b.shape[0]
-total_errores = result_df.shape[0]
-
-# Crear resumen en string
-summary_lines = []
-summary_lines.append("RESULTADOS DEL ANÁLISIS\n")
-summary_lines.append(f"➡️  Tamaño total de la flota: {total_flota} vehículos\n")
-
-summary_lines.append("📊 Distribución por estado en fleet-moviles:\n")
-estado_counts = fleet_filtered['Estado'].value_counts()
-for estado, count in estado_counts.items():
-    pct = (count / total_flota) * 100
-    summary_lines.append(f"   - {estado}: {count} vehículos ({pct:.2f}%)\n")
-
-summary_lines.append("\n⚠️ Inconsistencias detectadas:\n")
-summary_lines.append(f"🔄 Vehículos 'ATIVO - BIPANDO' que figuran en disponibilidad:\n")
-summary_lines.append(f"   {errores_a} vehículos ({(errores_a / total_flota) * 100:.2f}%)\n")
-summary_lines.append(f"🔄 Vehículos 'FROTA OCIOSA' que NO figuran en disponibilidad:\n")
-summary_lines.append(f"   {errores_b} vehículos ({(errores_b / total_flota) * 100:.2f}%)\n")
-
-summary_lines.append(f"\n🔄 Total de vehículos con estado a actualizar: {total_errores} vehículos ({(total_errores / total_flota) * 100:.2f}%)\n")
-
-
-# Guardar como archivo de texto
-with open("Resumen_analisis_vehiculos.txt", "w", encoding="utf-8") as f:
-    f.writelines(summary_lines)
-
-# Mostrar en consola también
-print("".join(summary_lines))
-print("📁 Archivo generado: Vehiculos_para_actualizar_estado.xlsx")
\ No newline at end of file
+"""
+Análisis offline de la flota con el mismo motor que /process (pipeline.py): reglas de
+ESTADO + SVC/MLP, alias de columnas y layout del template (solo encabezados).
+
+Sin argumentos se comporta como antes: lee fleet-moviles.xlsx / disponibilidad.xlsx del
+directorio actual y genera Vehiculos_para_actualizar_estado.xlsx y Resumen_analisis_vehiculos.txt.
+
+    python offline_fleet_analysis.py
+    python offline_fleet_analysis.py --fleet export.xlsx --disp disp.xlsx --format csv
+    python offline_fleet_analysis.py "regiones/**/*.xlsx" --out-dir salida/ --format parquet --workers 4
+    python offline_fleet_analysis.py --batch regiones.zip     (ver batch.py)
+
+Con varios archivos (globs), se agrupan en pares por región como en batch.py (carpeta por
+región o REGION-fleet-moviles.xlsx / REGION-disponibilidad.xlsx) y cada par se procesa en
+un proceso propio. No importa FastAPI: arranca rápido para correr desde cron.
+"""
+import argparse
+import glob
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from functools import partial
+from typing import Dict, List, Optional, Tuple
+
+from batch import read_pairs
+from pipeline import PipelineError, build_update, load_fleet, parse_disponibilidad, write_workbook
+from reconcile import ATIVO, OCIOSA
+from template_registry import TemplateLayout, load_template_headers
+from writers import DEFAULT_BACKEND, available_backends, format_info
+
+OUTPUT_NAME = "Vehiculos_para_actualizar_estado"
+SUMMARY_NAME = "Resumen_analisis_vehiculos.txt"
+FORMATS = {"xlsx": DEFAULT_BACKEND, "csv": "csv", "parquet": "parquet"}
+
+# Snapshot de la flota (ver snapshot.py); si existe y no se pasa --fleet se usa en lugar del Excel
+FLEET_SNAPSHOT = os.environ.get("FLEET_SNAPSHOT", "")
+
+
+def _read(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def analyze_pair(fleet_path: Optional[str], disp_path: str, layout: TemplateLayout,
+                 backend: str, out_path: str) -> dict:
+    """Reconcilia un par, escribe la planilla en `out_path` y devuelve los números del resumen."""
+    snapshot = FLEET_SNAPSHOT if (fleet_path is None and FLEET_SNAPSHOT) else None
+    fleet, _ = load_fleet(_read(fleet_path) if fleet_path else None, snapshot_path=snapshot)
+    disp = parse_disponibilidad(_read(disp_path))
+    output_df, changes_summary, table_data = build_update(fleet, disp, layout)
+    with open(out_path, "wb") as f:
+        f.write(write_workbook(output_df, layout.sheet_name, backend).getbuffer())
+
+    estado = output_df[layout.estado]
+    return {
+        "total_flota": len(fleet[0]),
+        "estados": table_data,
+        "a_ociosa": int((estado == OCIOSA).sum()),
+        "a_ativo": int((estado == ATIVO).sum()),
+        "changes_summary": changes_summary,
+        "output": out_path,
+    }
+
+
+def summary_text(result: dict, title: str = "RESULTADOS DEL ANÁLISIS") -> str:
+    total_flota = result["total_flota"]
+    s = result["changes_summary"]
+
+    def pct(n: int) -> str:
+        return f"{(n / total_flota) * 100:.2f}%" if total_flota else "0.00%"
+
+    lines = [f"{title}\n", f"➡️  Tamaño total de la flota: {total_flota} vehículos\n",
+             "📊 Distribución por estado en fleet-moviles:\n"]
+    for row in result["estados"]:
+        lines.append(f"   - {row['Estado']}: {row['Cantidad']} vehículos ({pct(row['Cantidad'])})\n")
+    lines += [
+        "\n⚠️ Inconsistencias detectadas:\n",
+        f"🔄 Vehículos '{ATIVO}' que figuran en disponibilidad:\n",
+        f"   {result['a_ociosa']} vehículos ({pct(result['a_ociosa'])})\n",
+        f"🔄 Vehículos '{OCIOSA}' que NO figuran en disponibilidad:\n",
+        f"   {result['a_ativo']} vehículos ({pct(result['a_ativo'])})\n",
+        f"\n🔄 Total de vehículos con estado a actualizar: {s['estado_changes']} vehículos "
+        f"({pct(s['estado_changes'])})\n",
+        f"🏢 Vehículos con Base (SVC) a actualizar: {s['svc_changes']}\n",
+        f"💼 Vehículos con Centro de Custos (MLP) a actualizar: {s['mlp_changes']}\n",
+        f"📄 Filas en la planilla de actualización: {s['total_rows']}\n",
+    ]
+    return "".join(lines)
+
+
+def _pairs(args) -> Dict[str, Tuple[Optional[str], str]]:
+    """{región: (fleet, disponibilidad)}; región "" para el par único."""
+    if not args.inputs:
+        fleet = args.fleet or (None if FLEET_SNAPSHOT and os.path.exists(FLEET_SNAPSHOT) else "fleet-moviles.xlsx")
+        return {"": (fleet, args.disp or "disponibilidad.xlsx")}
+    paths = sorted({p for pattern in args.inputs for p in glob.glob(pattern, recursive=True)})
+    if not paths:
+        raise PipelineError("Nenhum arquivo corresponde aos padrões informados.")
+    return read_pairs({p: p for p in paths})
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["--batch"]:
+        from batch import main as batch_main
+        return batch_main(argv[1:])
+
+    parser = argparse.ArgumentParser(description="Reconciliación offline de la flota (mismo motor que /process).")
+    parser.add_argument("inputs", nargs="*", help="globs de planillas, agrupadas en pares por región")
+    parser.add_argument("--fleet", help="planilla de flota (par único)")
+    parser.add_argument("--disp", help="planilla de disponibilidad (par único)")
+    parser.add_argument("--template", default="Planilla-Modelo.xlsx")
+    parser.add_argument("--sheet", default="Worksheet")
+    parser.add_argument("--format", choices=sorted(FORMATS), default="xlsx")
+    parser.add_argument("--out-dir", default=".")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args(argv)
+
+    backend = FORMATS[args.format]
+    if backend not in available_backends():
+        print(f"❌ Formato {args.format} no disponible (falta la dependencia opcional).")
+        return 1
+    # Solo encabezados del template, una vez para todos los pares
+    columns, sheet = load_template_headers(args.template, args.sheet)
+    layout = TemplateLayout("cli", args.template, sheet, columns, 0)
+    if not layout.dominio or not layout.estado:
+        print("❌ El template debe incluir 'Dominio' y 'Estado'.")
+        return 1
+
+    try:
+        pairs = _pairs(args)
+    except PipelineError as e:
+        print(f"❌ {e.message}")
+        return 1
+    os.makedirs(args.out_dir, exist_ok=True)
+    extension = format_info(backend)["extension"]
+    jobs = {region: (fleet, disp, layout, backend,
+                     os.path.join(args.out_dir, f"{region + '_' if region else ''}{OUTPUT_NAME}.{extension}"))
+            for region, (fleet, disp) in pairs.items()}
+
+    # Un proceso por par (si hay más de uno)
+    results, sections, failed = {}, [], 0
+    with (ProcessPoolExecutor(max_workers=min(args.workers or 1, len(jobs))) if len(jobs) > 1
+          else nullcontext()) as executor:
+        calls = {region: executor.submit(analyze_pair, *job).result if executor else partial(analyze_pair, *job)
+                 for region, job in jobs.items()}
+        for region, call in calls.items():
+            try:
+                results[region] = call()
+            except (PipelineError, OSError) as e:
+                failed += 1
+                sections.append(f"❌ {region or 'flota'}: {getattr(e, 'message', e)}\n")
+                continue
+            title = f"RESULTADOS DEL ANÁLISIS — {region}" if region else "RESULTADOS DEL ANÁLISIS"
+            sections.append(summary_text(results[region], title))
+    summary = "\n".join(sections)
+
+    # Guardar como archivo de texto y mostrar en consola también
+    with open(os.path.join(args.out_dir, SUMMARY_NAME), "w", encoding="utf-8") as f:
+        f.write(summary)
+    print(summary)
+    for result in results.values():
+        print(f"📁 Archivo generado: {result['output']}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,286 @@
+"""
+Pipeline de /process sin dependencias web: lectura, normalización, reconciliación y Excel.
+
+Es todo CPU (pandas/openpyxl), por eso main.py lo ejecuta en un pool de workers y no en el
+event loop. Las funciones son de módulo y reciben/devuelven objetos picklables para poder
+correr en un ProcessPoolExecutor.
+"""
+import io
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from cache import LRUCache
+from changes import ChangeList
+from disp_summary import ROWS_ATTR, summarize_disponibilidad
+from ingest import DISP_COLUMNS, FLEET_COLUMNS, pick_column, read_columns
+from metrics import StageTimer
+from reconcile import ATIVO, OCIOSA, modal_targets, normalize, normalize_categorical, reconcile
+from snapshot import FleetSnapshot, SnapshotMismatch, diff
+from template_registry import TemplateLayout
+from vehicle_index import VehicleIndex
+from writers import DEFAULT_BACKEND, write_output
+
+Columns = Dict[str, Optional[str]]
+
+# Frames ya parseados por hash de archivo: un archivo que no cambió (p. ej. la flota) se
+# reutiliza aunque el otro sea nuevo. Es por proceso: con pool de procesos cada worker
+# tiene la suya.
+PARSE_CACHE_MB = float(os.environ.get("PARSE_CACHE_MB", 64))
+_parse_cache = LRUCache(
+    max_entries=8,
+    max_bytes=int(PARSE_CACHE_MB * 1024 * 1024),
+    sizeof=lambda parsed: int(parsed[0].memory_usage(deep=True).sum()),
+)
+
+# Disponibilidades desde este tamaño se agregan en streaming (ver disp_summary.py): memoria
+# según los vehículos distintos y no según las filas. 0: siempre; negativo: nunca.
+DISP_CHUNKED_MB = float(os.environ.get("DISP_CHUNKED_MB", 16))
+
+# Roles normalizados como categóricas (pocos valores distintos: Estado, Base, Centro de Custos
+# y la placa de disponibilidad, repetida en muchas filas). La placa de la flota es casi única
+# por fila y queda como texto. COMPACT_DTYPES=0 vuelve a columnas de texto.
+CATEGORICAL_ROLES = ("estado", "svc", "mlp", "veic")
+COMPACT_DTYPES = os.environ.get("COMPACT_DTYPES", "1") == "1"
+
+
+class PipelineError(Exception):
+    """Error de datos de entrada, con el status HTTP a devolver."""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def _pick_col(df: pd.DataFrame, *candidates: str) -> Optional[str]:
+    """Devuelve el nombre real de columna del DF matcheando candidatos (case/acento/espacios insensible)."""
+    return pick_column(df.columns, *candidates)
+
+
+def _normalize_columns(df: pd.DataFrame, cols: Columns):
+    for role, col in cols.items():
+        if col and col in df.columns:
+            compact = COMPACT_DTYPES and role in CATEGORICAL_ROLES
+            df[col] = normalize_categorical(df[col]) if compact else normalize(df[col])
+
+
+def _cached(kind: str, key: Optional[str], parse, source):
+    """Devuelve el parseo cacheado para `key` (hash del archivo) o parsea y lo guarda."""
+    if key is None:
+        return parse(source)
+    parsed = _parse_cache.get((kind, key))
+    if parsed is None:
+        parsed = parse(source)
+        _parse_cache.put((kind, key), parsed)
+    return parsed
+
+
+# ---------- Etapas ----------
+def parse_fleet(source, key: Optional[str] = None) -> Tuple[pd.DataFrame, Columns]:
+    """
+    Lee y normaliza fleet-moviles. Devuelve (df, roles placa/estado/svc/mlp -> columna).
+    Con `key` (hash del archivo) se reutiliza un parseo anterior; el df no debe modificarse.
+    """
+    return _cached("fleet", key, _parse_fleet, source)
+
+
+def parse_disponibilidad(source, key: Optional[str] = None,
+                         chunked: Optional[bool] = None) -> Tuple[pd.DataFrame, Columns]:
+    """
+    Lee y normaliza disponibilidad. Devuelve (df, roles veic/svc/mlp -> columna). Ver `parse_fleet`.
+    `chunked`: agregar en streaming (df compacto, una fila por placa; ver disp_summary.py) o
+    leer todas las filas; None decide por tamaño con DISP_CHUNKED_MB. El resultado es el mismo.
+    """
+    if chunked is None:
+        chunked = 0 <= DISP_CHUNKED_MB * 1024 * 1024 <= _source_size(source)
+    if chunked:
+        return _cached("disp:chunked", key, _summarize_disponibilidad, source)
+    return _cached("disp", key, _parse_disponibilidad, source)
+
+
+def source_rows(df: pd.DataFrame) -> int:
+    """Filas leídas de la planilla (el df compacto de disponibilidad guarda las originales)."""
+    return df.attrs.get(ROWS_ATTR, len(df))
+
+
+def _source_size(source) -> int:
+    if isinstance(source, memoryview):
+        return source.nbytes
+    if isinstance(source, (bytes, bytearray)):
+        return len(source)
+    size = source.seek(0, io.SEEK_END)
+    source.seek(0)
+    return size
+
+
+def _parse_fleet(source) -> Tuple[pd.DataFrame, Columns]:
+    # Solo las columnas usadas, en streaming (encabezados ya normalizados con strip)
+    fleet_df = read_columns(source, FLEET_COLUMNS)
+    cols = {
+        "placa":  _pick_col(fleet_df, *FLEET_COLUMNS["placa"]),
+        "estado": _pick_col(fleet_df, *FLEET_COLUMNS["estado"]),
+        "svc":    _pick_col(fleet_df, *FLEET_COLUMNS["svc"]),   # Col C en fleet
+        "mlp":    _pick_col(fleet_df, *FLEET_COLUMNS["mlp"]),   # Col T en fleet
+    }
+    if not cols["placa"]:
+        raise PipelineError("Não encontrei a coluna de PLACA/DOMINIO na planilha de frota.")
+    _normalize_columns(fleet_df, cols)
+    return fleet_df, cols
+
+
+def _parse_disponibilidad(source, summarize: bool = False) -> Tuple[pd.DataFrame, Columns]:
+    disp_df = summarize_disponibilidad(source) if summarize else read_columns(source, DISP_COLUMNS)
+    cols = {
+        "veic": _pick_col(disp_df, *DISP_COLUMNS["veic"]),
+        "svc":  _pick_col(disp_df, *DISP_COLUMNS["svc"]),   # Col E en disponibilidad
+        "mlp":  _pick_col(disp_df, *DISP_COLUMNS["mlp"]),   # Col I en disponibilidad
+    }
+    if not cols["veic"]:
+        raise PipelineError("Não encontrei a coluna de VEÍCULO/VEICULO/PLACA na planilha de disponibilidade.")
+    _normalize_columns(disp_df, cols)
+    return disp_df, cols
+
+
+def _summarize_disponibilidad(source) -> Tuple[pd.DataFrame, Columns]:
+    return _parse_disponibilidad(source, summarize=True)
+
+
+def load_fleet(source, key: Optional[str] = None, snapshot_path: Optional[str] = None):
+    """
+    Flota a reconciliar: del upload (`source`) o, si es None, del snapshot en `snapshot_path`.
+    Con snapshot, un upload idéntico al que lo generó se carga del snapshot sin parsear el
+    XLSX, y uno distinto lo reemplaza. Devuelve ((df, cols), diff) con el diff por placa
+    respecto del snapshot ({"added", "removed", "changed"}: cantidades) o None.
+    """
+    if snapshot_path is None:
+        return parse_fleet(source, key), None
+    snap = FleetSnapshot(snapshot_path)
+    snap_key = snap.digest
+    if source is None:
+        if snap.meta() is None:
+            raise PipelineError("Não há snapshot da frota; envie a planilha de frota.")
+        try:
+            return _cached("fleet", snap_key, lambda _: snap.load(snap_key), None), None
+        except SnapshotMismatch:
+            raise PipelineError("O snapshot da frota está inconsistente; envie a planilha de frota.", status_code=409)
+    if key is not None and key == snap_key:
+        try:
+            return _cached("fleet", key, lambda _: snap.load(key), None), {"added": 0, "removed": 0, "changed": 0}
+        except SnapshotMismatch:
+            pass  # Los datos no son de este upload (otro save en el medio): se parsea y se reescribe
+
+    fleet = parse_fleet(source, key)
+    try:
+        previous = snap.load()
+    except (FileNotFoundError, SnapshotMismatch):
+        previous = (pd.DataFrame(columns=["placa"]), {"placa": "placa"})
+    changes = {name: len(plates) for name, plates in diff(previous, fleet).items()}
+    snap.save(*fleet, digest=key)
+    return fleet, changes
+
+
+def estado_table(fleet_df: pd.DataFrame, fleet_cols: Columns) -> List[dict]:
+    """Resumen por Estado (para tabla del frontend)."""
+    estado_col = fleet_cols.get("estado")
+    total_flota = len(fleet_df)
+    estado_counts = {}
+    estado_pct = {}
+    if estado_col and total_flota:
+        estado_counts = fleet_df[estado_col].value_counts().to_dict()
+        estado_pct = {k: round(v * 100 / total_flota, 2) for k, v in estado_counts.items()}
+    return [{"Estado": k, "Cantidad": v, "Porcentaje": estado_pct.get(k, 0)} for k, v in estado_counts.items()]
+
+
+def build_update(
+    fleet: Tuple[pd.DataFrame, Columns],
+    disp: Tuple[pd.DataFrame, Columns],
+    layout: TemplateLayout,
+    targets: Optional[Dict[str, pd.Series]] = None,
+) -> Tuple[pd.DataFrame, Dict[str, int], List[dict]]:
+    """Reglas de ESTADO + SVC/MLP. Devuelve (output_df, changes_summary, table_data)."""
+    fleet_df, fleet_cols = fleet
+    disp_df, disp_cols = disp
+    output_df, changes_summary = reconcile(
+        fleet_df, disp_df, fleet_cols, disp_cols,
+        template_cols=layout.columns, tpl_cols=layout.tpl_cols, targets=targets,
+    )
+    return output_df, changes_summary, estado_table(fleet_df, fleet_cols)
+
+
+def build_indexed_update(fleet: Tuple[pd.DataFrame, Columns], disp: Tuple[pd.DataFrame, Columns],
+                         layout: TemplateLayout) -> Tuple[pd.DataFrame, Dict[str, int], List[dict], VehicleIndex]:
+    """
+    `build_update` más el índice por placa (ver vehicle_index.py), en la misma ida al pool y
+    con la moda de disponibilidad calculada una sola vez para los dos.
+    """
+    targets = modal_targets(*disp)
+    return (*build_update(fleet, disp, layout, targets), VehicleIndex.build(fleet, disp, targets))
+
+
+def write_workbook(output_df: pd.DataFrame, sheet_name: str, backend: str = DEFAULT_BACKEND) -> io.BytesIO:
+    """Planilla en memoria con el backend de escritura elegido (ver writers.py)."""
+    return write_output(output_df, sheet_name, backend)
+
+
+# ---------- Pipeline completo ----------
+def run_pipeline(fleet_source, disp_source, layout: TemplateLayout, backend: str = DEFAULT_BACKEND,
+                 fleet_key: Optional[str] = None, disp_key: Optional[str] = None,
+                 snapshot_path: Optional[str] = None, with_index: bool = False) -> dict:
+    """
+    Las cuatro etapas en secuencia (una sola ida y vuelta al pool). `*_key`: ver `parse_fleet`;
+    `fleet_source` None / `snapshot_path`: ver `load_fleet`. Incluye `timings` (segundos por
+    etapa), `sizes` (filas de entrada/salida y bytes de la planilla) y `changes` (las filas de
+    la planilla en forma compacta, ver changes.py); con `with_index`, también `vehicle_index`
+    (ver `build_indexed_update`).
+    """
+    timer = StageTimer()
+    with timer.stage("parsing_fleet"):
+        fleet, fleet_diff = load_fleet(fleet_source, fleet_key, snapshot_path)
+    with timer.stage("parsing_disponibilidad"):
+        disp = parse_disponibilidad(disp_source, disp_key)
+    vehicle_index = None
+    with timer.stage("reconciling"):
+        if with_index:
+            output_df, changes_summary, table_data, vehicle_index = build_indexed_update(fleet, disp, layout)
+        else:
+            output_df, changes_summary, table_data = build_update(fleet, disp, layout)
+        changes = ChangeList.build(output_df, layout.tpl_cols)
+    with timer.stage("writing_xlsx"):
+        workbook = write_workbook(output_df, layout.sheet_name, backend)
+    return {
+        "table_data": table_data,
+        "changes_summary": changes_summary,
+        "workbook": workbook,
+        "fleet_diff": fleet_diff,
+        "vehicle_index": vehicle_index,
+        "changes": changes,
+        "timings": timer.timings,
+        "sizes": output_sizes(len(fleet[0]), source_rows(disp[0]), output_df, workbook),
+    }
+
+
+def warm_up(layout: TemplateLayout, backend: str = DEFAULT_BACKEND) -> float:
+    """
+    Corre el pipeline completo sobre un par mínimo armado en memoria (escritura XLSX, lectura,
+    reglas y escritura de la salida) para que el primer request no pague los imports diferidos
+    de pandas/openpyxl ni las primeras llamadas en frío. Devuelve los segundos que tardó.
+    """
+    t0 = time.perf_counter()
+    fleet = pd.DataFrame({"PLACA": ["AAA0A00", "BBB1B11"], "ESTADO": [ATIVO, OCIOSA],
+                          "BASE": ["SVC1", "SVC1"], "CENTRO DE CUSTOS": ["MLP1", "MLP1"]})
+    disp = pd.DataFrame({"VEÍCULO": ["AAA0A00"], "BASE": ["SVC2"], "CENTRO DE CUSTOS": ["MLP2"]})
+    run_pipeline(write_output(fleet, "Sheet1").getvalue(), write_output(disp, "Sheet1").getvalue(), layout, backend)
+    return time.perf_counter() - t0
+
+
+def output_sizes(fleet_rows: int, disp_rows: int, output_df: pd.DataFrame, workbook: io.BytesIO) -> Dict[str, int]:
+    """Filas leídas de cada planilla, filas escritas y tamaño del archivo generado."""
+    return {
+        "fleet_rows": fleet_rows,
+        "disponibilidad_rows": disp_rows,
+        "output_rows": len(output_df),
+        "output_bytes": workbook.getbuffer().nbytes,
+    }
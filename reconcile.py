@@ -0,0 +1,216 @@
+"""
+Motor de reconciliación flota vs disponibilidad, vectorizado.
+
+Todo se resuelve con operaciones de columna (conteos, un merge y máscaras booleanas): no hay
+trabajo Python por fila ni por vehículo. Las columnas pueden ser categóricas (ver
+`normalize_categorical`): modas y comparaciones se hacen sobre códigos enteros, llevando las
+columnas de flota y disponibilidad a un mismo diccionario de categorías (`shared_codes`).
+"""
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+ATIVO = "ATIVO - BIPANDO"
+OCIOSA = "FROTA OCIOSA"
+
+
+def normalize(series: pd.Series) -> pd.Series:
+    """Normalización común de valores: str/upper/strip."""
+    return series.astype(str).str.upper().str.strip()
+
+
+def _remap(codes: np.ndarray, mapping: np.ndarray) -> np.ndarray:
+    """`mapping[codes]` conservando los nulos (-1)."""
+    out = np.full(len(codes), -1, dtype=mapping.dtype if len(mapping) else np.int64)
+    found = codes >= 0
+    out[found] = mapping[codes[found]]
+    return out
+
+
+def normalize_categorical(series: pd.Series) -> pd.Series:
+    """
+    `normalize` como categórica (categorías en orden de aparición): se normalizan solo los
+    valores distintos, con el dtype de la columna, y los que quedan iguales se unifican.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes, uniques = series.cat.codes.to_numpy(), series.cat.categories
+    elif series.dtype == object:
+        # Tipos mezclados: True == 1 para el hash pero se normalizan distinto, va fila a fila
+        codes, categories = pd.factorize(normalize(series))
+        return pd.Series(pd.Categorical.from_codes(codes, categories), index=series.index, name=series.name)
+    else:
+        codes, uniques = pd.factorize(series)
+    mapping, categories = pd.factorize(normalize(pd.Series(uniques)))
+    if not np.array_equal(mapping, np.arange(len(mapping))):
+        codes = _remap(codes, mapping)
+    return pd.Series(pd.Categorical.from_codes(codes, categories), index=series.index, name=series.name)
+
+
+def _codes(series: pd.Series) -> Tuple[np.ndarray, pd.Index]:
+    """(códigos, valores distintos) de una columna, -1 = nulo; las categóricas sin recorrer filas."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy(), series.cat.categories
+    codes, uniques = pd.factorize(series)
+    return codes, pd.Index(uniques)
+
+
+def shared_codes(*series: pd.Series) -> Tuple[List[np.ndarray], pd.Index]:
+    """
+    Códigos de cada serie sobre un mismo diccionario de categorías (-1 = nulo), para comparar
+    columnas de frames distintos como enteros. Devuelve (códigos por serie, categorías).
+    """
+    parts = [_codes(s) for s in series]
+    categories = parts[0][1].append([uniques for _, uniques in parts[1:]]).unique()
+    return [_remap(codes, categories.get_indexer(uniques)) for codes, uniques in parts], categories
+
+
+def distinct(series: pd.Series) -> pd.Index:
+    """Valores no nulos distintos en orden de aparición (de una categórica, sin materializarla)."""
+    codes, uniques = _codes(series)
+    return uniques.take(pd.unique(codes[codes >= 0]))
+
+
+def modal_values(df: pd.DataFrame, key_col: str, value_col: str) -> pd.Series:
+    """
+    Moda no-nula de `value_col` por `key_col` (equivalente a groupby(...).apply(_most_frequent)).
+    En empate gana el valor que aparece primero, igual que value_counts().idxmax().
+    Las claves sin ningún valor no-nulo quedan con NaN. Cuenta pares de códigos enteros.
+    """
+    key_codes, keys = _codes(df[key_col])
+    values = normalize_categorical(df[value_col])
+    value_codes, values = values.cat.codes.to_numpy(), values.cat.categories
+    present = key_codes >= 0
+    paired = present & (value_codes >= 0)
+    width = max(len(values), 1)
+    # Un entero por par (clave, valor), numerado en orden de primera aparición como groupby(sort=False)
+    pair_codes, pairs = pd.factorize(key_codes[paired].astype(np.int64) * width + value_codes[paired])
+    counts = pd.Series(np.bincount(pair_codes, minlength=len(pairs)),
+                       index=pd.MultiIndex.from_arrays([keys.take(pairs // width), values.take(pairs % width)],
+                                                        names=[key_col, value_col]))
+    return modal_from_counts(counts, keys.take(pd.unique(key_codes[present])).array, value_col)
+
+
+def modal_from_counts(counts: pd.Series, keys, name: Optional[str] = None) -> pd.Series:
+    """
+    Moda por clave a partir de conteos indexados por (clave, valor) en orden de primera
+    aparición del par (como groupby(sort=False)); en empate gana el primero. Reindexada a `keys`.
+    """
+    counts = counts.sort_values(ascending=False, kind="stable")
+    counts = counts[~counts.index.get_level_values(0).duplicated()]
+    modal = pd.Series(counts.index.get_level_values(1), index=counts.index.get_level_values(0), name=name)
+    return modal.reindex(keys)
+
+
+def modal_targets(disp_df: pd.DataFrame, disp_cols: Dict[str, Optional[str]]) -> Dict[str, pd.Series]:
+    """Base ("svc") y Centro de Custos ("mlp") objetivo por vehículo: la moda en disponibilidad."""
+    targets = {}
+    for role in ("svc", "mlp"):
+        disp_col = disp_cols.get(role)
+        if disp_col and disp_col in disp_df.columns:
+            targets[role] = modal_values(disp_df, disp_cols["veic"], disp_col)
+    return targets
+
+
+def _differs(target: pd.Series, current: Optional[pd.Series]) -> np.ndarray:
+    """Objetivo nulo, o no vacío y distinto del valor actual (nulo = ""), comparando códigos."""
+    if current is None:
+        (tgt,), categories = shared_codes(target)
+    else:
+        (tgt, cur), categories = shared_codes(target, current)
+    empty = categories.get_indexer([""])[0]
+    cur = np.full(len(tgt), empty) if current is None else np.where(cur < 0, empty, cur)
+    return (tgt < 0) | ((tgt != empty) & (tgt != cur))
+
+
+def _sorted_unique(plates: pd.Series) -> pd.Index:
+    return pd.Index(plates.drop_duplicates().sort_values().values)
+
+
+def reconcile(
+    fleet_df: pd.DataFrame,
+    disp_df: pd.DataFrame,
+    fleet_cols: Dict[str, Optional[str]],
+    disp_cols: Dict[str, Optional[str]],
+    template_cols: List[str],
+    tpl_cols: Dict[str, Optional[str]],
+    targets: Optional[Dict[str, pd.Series]] = None,
+) -> Tuple[pd.DataFrame, Dict[str, int]]:
+    """
+    Compara flota y disponibilidad (ya normalizadas) y arma la planilla de actualización.
+
+    - fleet_cols: roles "placa", "estado", "svc", "mlp" -> columna real en fleet_df (o None)
+    - disp_cols:  roles "veic", "svc", "mlp" -> columna real en disp_df (o None)
+    - tpl_cols:   roles "dominio", "estado", "base", "mlp" -> columna del template (o None)
+    - targets:    `modal_targets(disp_df, disp_cols)` si ya se calculó
+
+    Devuelve (output_df con las columnas del template, changes_summary).
+    Orden de filas: cambios de Estado (ATIVO->OCIOSA, OCIOSA->ATIVO, ordenados por placa)
+    y después el resto de placas con cambios de SVC/MLP en el orden de la flota.
+    """
+    placa_col, estado_col = fleet_cols["placa"], fleet_cols.get("estado")
+    veic_col = disp_cols["veic"]
+    plates = fleet_df[placa_col]
+
+    # --- Reglas de ESTADO ---
+    estado_fix = pd.Series(dtype=object)
+    estado_changes = 0
+    if estado_col and estado_col in fleet_df.columns:
+        in_disp = plates.isin(distinct(disp_df[veic_col]))
+        estado = fleet_df[estado_col]
+        a_ociosa = _sorted_unique(plates[(estado == ATIVO) & in_disp])    # están ativos pero deberían ser ociosos
+        a_ativo = _sorted_unique(plates[(estado == OCIOSA) & ~in_disp])   # están ociosos pero deberían ser ativos
+        estado_changes = len(a_ociosa) + len(a_ativo)
+        estado_fix = pd.concat([pd.Series(OCIOSA, index=a_ociosa, dtype=object),
+                                pd.Series(ATIVO, index=a_ativo, dtype=object)])
+    estado_order = estado_fix.index.unique()
+    estado_fix = estado_fix[~estado_fix.index.duplicated(keep="last")]
+
+    # --- SVC (Base) / MLP (Centro de Custos): moda de disponibilidad vs valor actual en flota ---
+    vehicles = pd.DataFrame(index=pd.Index(plates.unique()))
+    if targets is None:
+        targets = modal_targets(disp_df, disp_cols)
+    targets = {f"{role}_tgt": target for role, target in targets.items()}
+    for role in ("svc", "mlp"):
+        fleet_col = fleet_cols.get(role)
+        if fleet_col and fleet_col in fleet_df.columns:
+            # Última fila por placa gana (como set_index(...).to_dict())
+            last = fleet_df.drop_duplicates(placa_col, keep="last").set_index(placa_col)[fleet_col]
+            vehicles[f"{role}_cur"] = last.reindex(vehicles.index)
+    if targets:
+        vehicles = vehicles.merge(pd.DataFrame(targets), how="left", left_index=True, right_index=True)
+
+    # Un vehículo de disponibilidad sin ningún valor tiene objetivo NaN: el flujo original lo
+    # contaba como cambio (NaN es truthy) y se mantiene así para no alterar changes_summary.
+    listed = vehicles.index.isin(distinct(disp_df[veic_col]))
+    changed = {}
+    for role, tpl_role in (("svc", "base"), ("mlp", "mlp")):
+        tgt = vehicles.get(f"{role}_tgt")
+        if not tpl_cols.get(tpl_role) or tgt is None:
+            changed[role] = pd.Series(False, index=vehicles.index)
+            continue
+        changed[role] = pd.Series(listed & _differs(tgt, vehicles.get(f"{role}_cur")), index=vehicles.index)
+
+    svc_changed, mlp_changed = changed["svc"], changed["mlp"]
+    changes_summary = {
+        "svc_changes": int(svc_changed.sum()),
+        "mlp_changes": int(mlp_changed.sum()),
+        "estado_changes": estado_changes,
+        "both_changes": int((svc_changed & mlp_changed).sum()),
+        "total_rows": 0,
+    }
+
+    # --- Planilla de salida (una fila por patente) ---
+    other = vehicles.index[(svc_changed | mlp_changed).values]
+    order = estado_order.append(other[~other.isin(estado_order)])
+
+    output_df = pd.DataFrame("", index=pd.RangeIndex(len(order)), columns=template_cols, dtype=object)
+    output_df[tpl_cols["dominio"]] = order.values
+    output_df[tpl_cols["estado"]] = estado_fix.reindex(order).fillna("").values
+    for role, tpl_role in (("svc", "base"), ("mlp", "mlp")):
+        col = tpl_cols.get(tpl_role)
+        if col and changed[role].any():
+            values = vehicles[f"{role}_tgt"].where(changed[role])
+            output_df[col] = values.reindex(order).fillna("").values
+    changes_summary["total_rows"] = len(output_df)
+    return output_df, changes_summary
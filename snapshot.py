@@ -0,0 +1,171 @@
+"""
+Snapshot persistente de la flota normalizada (clave: placa), para no releer el XLSX.
+
+- Formato columnar: Feather (Arrow IPC, leído con memory-map) o Parquet, si está pyarrow;
+  si no, pickle de pandas. Se elige por la extensión del archivo.
+- Los metadatos (columnas por rol, sha256 del XLSX de origen, cantidad de filas y fecha) van
+  dentro del mismo archivo, que se reemplaza con un solo rename: datos y digest no pueden
+  quedar de flotas distintas. Al lado va una copia en `<archivo>.json` para leer el digest sin
+  abrir los datos; `load` verifica que coincida con lo que leyó.
+- `diff` compara dos flotas por placa: altas, bajas y placas con Estado/SVC/MLP distinto.
+
+Uso suelto: python snapshot.py fleet-moviles.xlsx fleet.feather
+"""
+import json
+import os
+import tempfile
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from reconcile import shared_codes
+
+try:  # Formatos columnares opcionales
+    import pyarrow
+    import pyarrow.feather
+    import pyarrow.parquet
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+Columns = Dict[str, Optional[str]]
+
+_EXTENSIONS = {".feather": "feather", ".arrow": "feather", ".parquet": "parquet", ".pkl": "pickle", ".pickle": "pickle"}
+COMPARED_ROLES = ("estado", "svc", "mlp")
+# Clave de los metadatos en el esquema Arrow (feather/parquet)
+_META_KEY = b"fleet_snapshot"
+
+
+class SnapshotMismatch(Exception):
+    """El archivo de datos no corresponde al digest/filas esperados (o no trae metadatos)."""
+
+
+class FleetSnapshot:
+    def __init__(self, path: str):
+        self.path = path
+        self.meta_path = path + ".json"
+        self.fmt = _EXTENSIONS.get(os.path.splitext(path)[1].lower(), "feather" if HAS_PYARROW else "pickle")
+        if self.fmt != "pickle" and not HAS_PYARROW:
+            raise ValueError(f"El formato {self.fmt} necesita pyarrow; use un snapshot .pkl")
+
+    def meta(self) -> Optional[dict]:
+        """Metadatos del snapshot, o None si todavía no hay."""
+        try:
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    @property
+    def digest(self) -> Optional[str]:
+        """sha256 del XLSX del que salió el snapshot."""
+        meta = self.meta()
+        return meta.get("digest") if meta else None
+
+    def load(self, digest: Optional[str] = None) -> Tuple[pd.DataFrame, Columns]:
+        """
+        Flota del snapshot. Verifica los metadatos guardados con los datos contra `digest`
+        (por defecto el del `.json`) y contra las filas leídas: si no coinciden (otro proceso
+        lo reemplazó en el medio, o es de una versión sin metadatos) levanta SnapshotMismatch.
+        """
+        meta = self.meta()
+        if meta is None:
+            raise FileNotFoundError(self.path)
+        if digest is None:
+            digest = meta.get("digest")
+        df, stored = self._read()
+        if stored is None or stored.get("digest") != digest or stored.get("rows") != len(df):
+            raise SnapshotMismatch(self.path)
+        return df, stored["columns"]
+
+    def save(self, df: pd.DataFrame, cols: Columns, digest: Optional[str] = None):
+        """Reemplaza el snapshot (datos con sus metadatos en un rename; después la copia .json)."""
+        df = df.reset_index(drop=True)
+        meta = {"columns": cols, "digest": digest, "rows": len(df), "format": self.fmt,
+                "saved_at": datetime.now().isoformat(timespec="seconds")}
+        self._replace(self.path, lambda path: self._write(df, meta, path))
+        self._replace(self.meta_path, lambda path: _write_json(meta, path))
+
+    def _read(self) -> Tuple[pd.DataFrame, Optional[dict]]:
+        if self.fmt == "pickle":
+            data = pd.read_pickle(self.path)
+            if isinstance(data, dict) and "frame" in data:
+                return data["frame"], data.get("meta")
+            return data, None
+        if self.fmt == "feather":
+            table = pyarrow.feather.read_table(self.path, memory_map=True)
+        else:
+            table = pyarrow.parquet.read_table(self.path)
+        stored = (table.schema.metadata or {}).get(_META_KEY)
+        return table.to_pandas(), json.loads(stored) if stored else None
+
+    def _write(self, df: pd.DataFrame, meta: dict, path: str):
+        if self.fmt == "pickle":
+            pd.to_pickle({"meta": meta, "frame": df}, path)
+            return
+        table = pyarrow.Table.from_pandas(df, preserve_index=False)
+        metadata = dict(table.schema.metadata or {})
+        metadata[_META_KEY] = json.dumps(meta, ensure_ascii=False).encode("utf-8")
+        table = table.replace_schema_metadata(metadata)
+        if self.fmt == "feather":
+            pyarrow.feather.write_feather(table, path)
+        else:
+            pyarrow.parquet.write_table(table, path)
+
+    @staticmethod
+    def _replace(path: str, write):
+        fd, tmp = tempfile.mkstemp(prefix=".snapshot-", dir=os.path.dirname(os.path.abspath(path)))
+        os.close(fd)
+        try:
+            write(tmp)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+
+def _write_json(data: dict, path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+
+
+def _by_plate(fleet: Tuple[pd.DataFrame, Columns]) -> pd.DataFrame:
+    """Estado/SVC/MLP por placa (primera aparición), con los roles como nombres de columna."""
+    df, cols = fleet
+    roles = [r for r in COMPARED_ROLES if cols.get(r)]
+    frame = df[[cols["placa"]] + [cols[r] for r in roles]]
+    frame.columns = ["placa"] + roles
+    return frame.dropna(subset=["placa"]).drop_duplicates("placa").set_index("placa")
+
+
+def diff(old: Tuple[pd.DataFrame, Columns], new: Tuple[pd.DataFrame, Columns]) -> Dict[str, pd.Index]:
+    """Placas agregadas, quitadas y con algún valor distinto entre `old` y `new`."""
+    before, after = _by_plate(old), _by_plate(new)
+    common = before.index.intersection(after.index)
+    roles = [r for r in before.columns if r in after.columns]
+    differs = np.zeros(len(common), dtype=bool)
+    for role in roles:
+        # Códigos sobre categorías comunes: dos nulos son iguales
+        (x, y), _ = shared_codes(before.loc[common, role], after.loc[common, role])
+        differs |= x != y
+    return {
+        "added": after.index.difference(before.index),
+        "removed": before.index.difference(after.index),
+        "changed": common[differs],
+    }
+
+
+if __name__ == "__main__":
+    import sys
+
+    from cache import digest
+    from pipeline import parse_fleet
+
+    source, target = sys.argv[1:3]
+    with open(source, "rb") as f:
+        data = f.read()
+    fleet_df, fleet_cols = parse_fleet(data)
+    FleetSnapshot(target).save(fleet_df, fleet_cols, digest(data))
+    print(f"{target}: {len(fleet_df)} filas")
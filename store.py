@@ -0,0 +1,206 @@
+"""
+Almacén acotado de resultados para descarga (token -> planilla generada).
+
+- Tope de bytes en memoria y en disco, con desalojo LRU.
+- TTL por entrada y barrido periódico en un hilo de fondo.
+- Los resultados grandes (>= spill_threshold) se escriben a un archivo temporal y se
+  sirven como archivo en lugar de quedar en RAM.
+"""
+import io
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Union
+
+
+class StoredResult:
+    """Resultado guardado: en memoria (`stream`) o volcado a disco (`path`)."""
+
+    __slots__ = ("stream", "path", "size", "expires_at", "media_type", "filename")
+
+    def __init__(self, size: int, expires_at: float,
+                 stream: Optional[io.BytesIO] = None, path: Optional[str] = None,
+                 media_type: Optional[str] = None, filename: Optional[str] = None):
+        self.stream = stream
+        self.path = path
+        self.size = size
+        self.expires_at = expires_at
+        self.media_type = media_type
+        self.filename = filename
+
+    @property
+    def on_disk(self) -> bool:
+        return self.path is not None
+
+    def discard(self):
+        """Libera el recurso (borra el archivo volcado, si lo hay)."""
+        if self.path:
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+        self.stream = None
+
+
+class ResultStore:
+    def __init__(
+        self,
+        max_memory_bytes: int = 64 * 1024 * 1024,
+        max_disk_bytes: int = 512 * 1024 * 1024,
+        ttl_seconds: float = 1800,
+        spill_threshold: int = 8 * 1024 * 1024,
+        spill_dir: Optional[str] = None,
+        sweep_interval: float = 30,
+    ):
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.ttl_seconds = ttl_seconds
+        self.spill_threshold = spill_threshold
+        self.spill_dir = spill_dir
+        self.sweep_interval = sweep_interval
+
+        self._entries: "OrderedDict[str, StoredResult]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "spills": 0}
+        self._memory_bytes = 0
+        self._disk_bytes = 0
+
+    # ---------- Ciclo de vida ----------
+    def start(self):
+        """Arranca el barrido de expirados en segundo plano."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sweep_loop, name="result-store-sweeper", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Detiene el barrido y libera todas las entradas (incluidos archivos volcados)."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+        with self._lock:
+            for entry in self._entries.values():
+                entry.discard()
+            self._entries.clear()
+            self._memory_bytes = self._disk_bytes = 0
+
+    def _sweep_loop(self):
+        while not self._stop.wait(self.sweep_interval):
+            self.expire()
+
+    # ---------- Operaciones ----------
+    def put(self, token: str, data: Union[bytes, io.BytesIO],
+            media_type: Optional[str] = None, filename: Optional[str] = None):
+        """Guarda el resultado bajo `token` (con su tipo/nombre de descarga), desalojando por LRU si hace falta."""
+        payload = data.getbuffer() if isinstance(data, io.BytesIO) else memoryview(data)
+        size = payload.nbytes
+        expires_at = time.monotonic() + self.ttl_seconds
+
+        spill = size >= self.spill_threshold or size > self.max_memory_bytes
+        if spill:
+            if size > self.max_disk_bytes:
+                raise ValueError("Resultado demasiado grande para el almacén de descargas.")
+            fd, path = tempfile.mkstemp(prefix="result-", suffix=".bin", dir=self.spill_dir)
+            with os.fdopen(fd, "wb") as f:
+                f.write(payload)
+            entry = StoredResult(size, expires_at, path=path, media_type=media_type, filename=filename)
+        else:
+            stream = data if isinstance(data, io.BytesIO) else io.BytesIO(data)
+            entry = StoredResult(size, expires_at, stream=stream, media_type=media_type, filename=filename)
+        del payload
+
+        with self._lock:
+            old = self._entries.pop(token, None)
+            if old is not None:
+                self._account(old, -1)
+                old.discard()
+            if spill:
+                self._counters["spills"] += 1
+                self._make_room(disk=size)
+            else:
+                self._make_room(memory=size)
+            self._entries[token] = entry
+            self._account(entry, +1)
+
+    def get(self, token: str) -> Optional[StoredResult]:
+        """Devuelve la entrada sin retirarla (la marca como usada recientemente)."""
+        with self._lock:
+            entry = self._live(token)
+            if entry is not None:
+                self._entries.move_to_end(token)
+            return entry
+
+    def pop(self, token: str) -> Optional[StoredResult]:
+        """Retira y devuelve la entrada. Si está en disco, el llamador debe `discard()`-earla."""
+        with self._lock:
+            entry = self._live(token)
+            if entry is not None:
+                del self._entries[token]
+                self._account(entry, -1)
+            return entry
+
+    def expire(self) -> int:
+        """Elimina las entradas vencidas; devuelve cuántas."""
+        now = time.monotonic()
+        with self._lock:
+            expired = [t for t, e in self._entries.items() if e.expires_at <= now]
+            for token in expired:
+                self._drop(token)
+            self._counters["expirations"] += len(expired)
+        return len(expired)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                **self._counters,
+                "entries": len(self._entries),
+                "resident_bytes": self._memory_bytes,
+                "spilled_bytes": self._disk_bytes,
+                "max_memory_bytes": self.max_memory_bytes,
+                "max_disk_bytes": self.max_disk_bytes,
+            }
+
+    def __contains__(self, token: str) -> bool:
+        with self._lock:
+            return token in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # ---------- Internos (con lock tomado) ----------
+    def _live(self, token: str) -> Optional[StoredResult]:
+        entry = self._entries.get(token)
+        if entry is not None and entry.expires_at <= time.monotonic():
+            self._drop(token)
+            self._counters["expirations"] += 1
+            entry = None
+        self._counters["hits" if entry is not None else "misses"] += 1
+        return entry
+
+    def _account(self, entry: StoredResult, sign: int):
+        if entry.on_disk:
+            self._disk_bytes += sign * entry.size
+        else:
+            self._memory_bytes += sign * entry.size
+
+    def _drop(self, token: str):
+        entry = self._entries.pop(token)
+        self._account(entry, -1)
+        entry.discard()
+
+    def _make_room(self, memory: int = 0, disk: int = 0):
+        """Desaloja las entradas menos usadas del mismo tipo hasta que entre la nueva."""
+        for token in list(self._entries):
+            if self._memory_bytes + memory <= self.max_memory_bytes and self._disk_bytes + disk <= self.max_disk_bytes:
+                break
+            entry = self._entries[token]
+            if (memory and not entry.on_disk and self._memory_bytes + memory > self.max_memory_bytes) or \
+               (disk and entry.on_disk and self._disk_bytes + disk > self.max_disk_bytes):
+                self._drop(token)
+                self._counters["evictions"] += 1
@@ -0,0 +1,91 @@
+"""
+Registro de templates de salida (Planilla-Modelo.xlsx y variantes con nombre).
+
+Cada template se parsea una sola vez (al arrancar la app) y se guarda su layout: columnas
+en orden y columnas reales de Dominio / Estado / Base / Centro de Custos. Si el archivo
+cambia en disco (mtime), se vuelve a leer en el próximo `get`.
+"""
+import logging
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from ingest import pick_column
+
+DEFAULT_TEMPLATE = "default"
+
+logger = logging.getLogger(__name__)
+
+
+def load_template_headers(template_path: str, sheet_name: Optional[str]) -> Tuple[List[str], str]:
+    """Lee solo encabezados del template, intentando la hoja pedida y si no, la primera."""
+    with pd.ExcelFile(template_path) as xl:
+        target = sheet_name if (sheet_name and sheet_name in xl.sheet_names) else xl.sheet_names[0]
+        df_headers = xl.parse(target, nrows=0)
+    return list(df_headers.columns), target
+
+
+class TemplateLayout:
+    """Encabezados del template y columnas resueltas por rol (None si el template no la tiene)."""
+
+    def __init__(self, name: str, path: str, sheet_name: str, columns: List[str], mtime_ns: int):
+        self.name = name
+        self.path = path
+        self.sheet_name = sheet_name
+        self.columns = columns
+        self.mtime_ns = mtime_ns
+        self.dominio = pick_column(columns, "Dominio", "Placa", "Patente", "DOMINIO")
+        self.estado = pick_column(columns, "Estado", "STATUS", "ESTADO")
+        self.base = pick_column(columns, "Base")  # SVC
+        self.mlp = pick_column(columns, "Centro de Custos", "Centro de Custo")
+
+    @property
+    def tpl_cols(self) -> Dict[str, Optional[str]]:
+        """Roles -> columna del template, en el formato que espera `reconcile`."""
+        return {"dominio": self.dominio, "estado": self.estado, "base": self.base, "mlp": self.mlp}
+
+    @property
+    def version(self) -> str:
+        """Identifica el contenido actual del template (cambia si se modifica el archivo)."""
+        return f"{self.name}:{self.mtime_ns}"
+
+
+class TemplateRegistry:
+    def __init__(self):
+        self._sources: Dict[str, Tuple[str, Optional[str]]] = {}
+        self._layouts: Dict[str, TemplateLayout] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, path: str, sheet_name: Optional[str] = None):
+        with self._lock:
+            self._sources[name] = (path, sheet_name)
+            self._layouts.pop(name, None)
+
+    def names(self) -> List[str]:
+        return list(self._sources)
+
+    def load_all(self):
+        """Parsea todos los templates registrados (se llama al arrancar la app)."""
+        for name in self.names():
+            try:
+                self.get(name)
+            except Exception:
+                # No impedir el arranque: el error vuelve a aparecer en el request que lo use
+                logger.exception("No se pudo leer el template %r", name)
+
+    def get(self, name: str = DEFAULT_TEMPLATE) -> TemplateLayout:
+        """Layout del template `name`; lo relee solo si cambió el mtime. KeyError si no existe."""
+        path, sheet_name = self._sources[name]
+        mtime_ns = os.stat(path).st_mtime_ns
+        layout = self._layouts.get(name)
+        if layout is not None and layout.mtime_ns == mtime_ns:
+            return layout
+        with self._lock:
+            layout = self._layouts.get(name)
+            if layout is None or layout.mtime_ns != mtime_ns:
+                columns, sheet = load_template_headers(path, sheet_name)
+                layout = TemplateLayout(name, path, sheet, columns, mtime_ns)
+                self._layouts[name] = layout
+            return layout
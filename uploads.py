@@ -0,0 +1,105 @@
+"""
+Lectura de uploads sin copias innecesarias y límites de tamaño.
+
+- `open_upload` devuelve el contenido de un UploadFile para el pipeline: si Starlette ya lo
+  volcó a disco (SpooledTemporaryFile > 1 MB) se lee directamente de ese archivo, sin
+  copiarlo a memoria, a través de un descriptor duplicado que sigue abierto después de que
+  FastAPI cierra el upload (sirve para /jobs); quien lo usa lo cierra con `close_sources`. Los
+  archivos chicos, o cuando el pipeline corre en otro proceso (hay que enviarlo por pickle), se
+  leen una sola vez a bytes.
+- `BodySizeLimit` rechaza con 413 los requests más grandes que el tope antes de leer el
+  cuerpo (por Content-Length) o apenas lo superan (cuerpos sin Content-Length).
+"""
+import io
+import json
+import os
+from typing import BinaryIO, Optional, Union
+
+from fastapi import UploadFile
+from starlette.formparsers import MultiPartParser
+
+from pipeline import PipelineError
+
+Source = Union[bytes, BinaryIO]
+
+
+def _too_large_message(limit_bytes: int) -> str:
+    return f"Arquivo muito grande (máximo {limit_bytes / (1024 * 1024):g} MB)."
+
+
+def check_size(upload: UploadFile, limit_bytes: int):
+    """PipelineError 413 si el archivo supera `limit_bytes` (antes de leerlo o parsearlo)."""
+    if upload.size is not None and upload.size > limit_bytes:
+        raise PipelineError(f"{upload.filename}: {_too_large_message(limit_bytes)}", status_code=413)
+
+
+async def open_upload(upload: UploadFile, limit_bytes: int, shareable: bool = True) -> Source:
+    """
+    Contenido de `upload` listo para `read_columns`/`digest` (el tamaño declarado ya se validó
+    con `check_size`). `shareable=False` cuando el resultado tiene que cruzar a otro proceso (un
+    archivo abierto no se puede picklear). Un archivo devuelto se cierra con `close_sources`.
+    """
+    # Por encima de spool_max_size Starlette ya lo volcó a un archivo real
+    if shareable and upload.size is not None and upload.size > MultiPartParser.spool_max_size:
+        try:
+            return os.fdopen(os.dup(upload.file.fileno()), "rb")
+        except (io.UnsupportedOperation, AttributeError):
+            pass  # Sin descriptor: se lee a bytes
+    await upload.seek(0)
+    data = await upload.read()
+    if len(data) > limit_bytes:  # Sin `size` conocido
+        raise PipelineError(f"{upload.filename}: {_too_large_message(limit_bytes)}", status_code=413)
+    return data
+
+
+def close_sources(*sources: Optional[Source]):
+    """Cierra los archivos que devolvió `open_upload` (bytes y None se ignoran)."""
+    for source in sources:
+        if source is not None and not isinstance(source, (bytes, bytearray, memoryview)):
+            source.close()
+
+
+class BodySizeLimit:
+    """Middleware ASGI: tope total del cuerpo de los requests HTTP."""
+
+    def __init__(self, app, max_bytes: int):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope.get("headers") or [])
+        length = headers.get(b"content-length")
+        if length is not None and length.isdigit() and int(length) > self.max_bytes:
+            return await self._reject(send)
+
+        received = 0
+        rejected = False
+
+        async def limited_receive():
+            nonlocal received, rejected
+            if rejected:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # Se responde 413 y la app ve el cliente desconectado
+                    rejected = True
+                    await self._reject(send)
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message):
+            if not rejected:
+                await send(message)
+
+        await self.app(scope, limited_receive, guarded_send)
+
+    async def _reject(self, send):
+        body = json.dumps({"error": _too_large_message(self.max_bytes)}).encode()
+        await send({"type": "http.response.start", "status": 413,
+                    "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]})
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,158 @@
+"""
+Índice en memoria de la última flota + disponibilidad procesadas, para consultar placas
+sueltas sin volver a subir las planillas (GET /vehicles/{placa}, POST /vehicles/lookup).
+
+Una fila por placa normalizada (flota ∪ disponibilidad) con un hash index de pandas sobre
+la placa (búsqueda O(1)) y los valores en columnas categóricas: cada vehículo ocupa unos
+pocos bytes de códigos más la placa; los textos repetidos (Estado, Base, Centro de Custos)
+se guardan una sola vez. Los objetivos de disponibilidad son la moda por placa de
+`reconcile.modal_targets`, los mismos que usa /process.
+"""
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from reconcile import ATIVO, OCIOSA, distinct, modal_targets, normalize
+
+Columns = Dict[str, Optional[str]]
+
+# Campos de la respuesta, cada uno una columna categórica del índice
+# (svc = Base, mlp = Centro de Custos; *_target = moda en disponibilidad)
+_FIELDS = ("estado", "svc", "mlp", "svc_target", "mlp_target")
+
+
+def normalize_plate(plate: str) -> str:
+    """Misma normalización que las planillas (str/upper/strip)."""
+    return str(plate).upper().strip()
+
+
+def _categorical(values: np.ndarray, positions: np.ndarray) -> pd.Categorical:
+    """`values[positions]` como categórica; posición -1 (placa sin dato) queda nula."""
+    codes, categories = pd.factorize(values, use_na_sentinel=True)
+    dtype = np.int8 if len(categories) < 127 else np.int16 if len(categories) < 32767 else np.int32
+    out = np.full(len(positions), -1, dtype=dtype)
+    found = positions >= 0
+    out[found] = codes[positions[found]]
+    return pd.Categorical.from_codes(out, categories=categories)
+
+
+class VehicleIndex:
+    def __init__(self, plates: pd.Index, values: Dict[str, pd.Categorical], in_fleet: np.ndarray,
+                 in_disp: np.ndarray, built_at: float):
+        self.plates = plates
+        self.values = values
+        self.in_fleet = in_fleet
+        self.in_disp = in_disp
+        self.built_at = built_at
+
+    @classmethod
+    def build(cls, fleet: Tuple[pd.DataFrame, Columns], disp: Tuple[pd.DataFrame, Columns],
+              targets: Optional[Dict[str, pd.Series]] = None) -> "VehicleIndex":
+        """
+        Índice a partir de la flota y la disponibilidad ya parseadas (ver `pipeline.parse_*`).
+        `targets`: `reconcile.modal_targets(*disp)` si ya se calculó.
+        """
+        fleet_df, fleet_cols = fleet
+        disp_df, disp_cols = disp
+        placa_col, veic_col = fleet_cols["placa"], disp_cols["veic"]
+        if targets is None:
+            targets = modal_targets(disp_df, disp_cols)
+
+        # Última fila por placa gana (como `reconcile`); las placas solo de disponibilidad al final
+        last = fleet_df.drop_duplicates(placa_col, keep="last").dropna(subset=[placa_col])
+        n_fleet = len(last)
+        disp_plates = distinct(disp_df[veic_col])
+        plates = pd.Index(np.concatenate([last[placa_col].to_numpy(dtype=object),
+                                          disp_plates.to_numpy(dtype=object)])).unique()
+
+        def mask(keys: pd.Series) -> np.ndarray:
+            """Placas de `plates` que aparecen en `keys` (con la tabla hash del índice)."""
+            out = np.zeros(len(plates), dtype=bool)
+            positions = plates.get_indexer(keys)
+            out[positions[positions >= 0]] = True
+            return out
+
+        # Fila de cada placa en `last` / en cada objetivo (-1: no está)
+        fleet_positions = np.arange(len(plates))
+        fleet_positions[n_fleet:] = -1
+        missing = np.full(len(plates), -1)
+        values = {}
+        for role in ("estado", "svc", "mlp"):
+            col = fleet_cols.get(role)
+            if col and col in last.columns:
+                values[role] = _categorical(last[col].to_numpy(dtype=object), fleet_positions)
+            else:
+                values[role] = _categorical(np.array([], dtype=object), missing)
+        for role in ("svc", "mlp"):
+            target = targets.get(role)
+            if target is not None:
+                values[f"{role}_target"] = _categorical(target.to_numpy(dtype=object), target.index.get_indexer(plates))
+            else:
+                values[f"{role}_target"] = _categorical(np.array([], dtype=object), missing)
+        in_fleet, in_disp = fleet_positions >= 0, mask(disp_plates)
+
+        # Cambio de Estado como en `reconcile`: cuenta cualquier fila de la placa, no solo la última
+        estado_col = fleet_cols.get("estado")
+        estado_codes = np.full(len(plates), -1, dtype=np.int8)
+        if estado_col and estado_col in fleet_df.columns:
+            estado = fleet_df[estado_col]
+            estado_codes[mask(fleet_df.loc[estado == OCIOSA, placa_col]) & ~in_disp] = 1
+            estado_codes[mask(fleet_df.loc[estado == ATIVO, placa_col]) & in_disp] = 0
+        values["estado_update"] = pd.Categorical.from_codes(estado_codes, categories=[OCIOSA, ATIVO])
+        return cls(plates, values, in_fleet, in_disp, time.time())
+
+    def __len__(self) -> int:
+        return len(self.plates)
+
+    def _record(self, i: int) -> dict:
+        row = {}
+        for field in _FIELDS:
+            column = self.values[field]
+            code = column.codes[i]
+            row[field] = column.categories[code] if code >= 0 else None
+        in_disp = bool(self.in_disp[i])
+        # Mismas reglas que `reconcile`, sin depender de las columnas del template
+        estado_update = self.values["estado_update"]
+        code = estado_update.codes[i]
+        updates = {"estado": estado_update.categories[code] if code >= 0 else None}
+        for role in ("svc", "mlp"):
+            target = row[f"{role}_target"]
+            changed = in_disp and (target is None or (target != "" and target != (row[role] or "")))
+            # Figura en disponibilidad sin ningún valor: /process escribe la celda vacía
+            updates[role] = (target or "") if changed else None
+        return {
+            "plate": self.plates[i],
+            "in_fleet": bool(self.in_fleet[i]),
+            "in_disponibilidad": in_disp,
+            **row,
+            "updates": updates,
+        }
+
+    def lookup(self, plate: str) -> Optional[dict]:
+        """Datos de una placa (cualquier formato de mayúsculas/espacios) o None."""
+        try:
+            i = self.plates.get_loc(normalize_plate(plate))
+        except KeyError:
+            return None
+        return self._record(i)
+
+    def lookup_many(self, plates: Iterable[str]) -> Dict[str, Optional[dict]]:
+        """{placa pedida: datos o None}, con una sola búsqueda vectorizada."""
+        plates = list(plates)
+        keys = normalize(pd.Series(plates, dtype=object)).to_numpy(dtype=object)
+        positions = self.plates.get_indexer(keys)
+        return {plate: (self._record(i) if i >= 0 else None) for plate, i in zip(plates, positions)}
+
+    @property
+    def nbytes(self) -> int:
+        """Memoria del índice: placas (con su tabla hash), códigos y categorías."""
+        total = self.plates.memory_usage(deep=True) + self.in_fleet.nbytes + self.in_disp.nbytes
+        for column in self.values.values():
+            total += column.memory_usage(deep=True)
+        return int(total)
+
+    def stats(self) -> Dict[str, float]:
+        return {"vehicles": len(self), "bytes": self.nbytes, "built_at": self.built_at}
+
@@ -0,0 +1,173 @@
+"""
+Backends de escritura de la planilla de actualización.
+
+- "openpyxl":            pd.ExcelWriter(engine="openpyxl") (arma todo el grafo de celdas en memoria).
+- "openpyxl-write-only": openpyxl en modo write-only, fila a fila.
+- "xlsxwriter":          xlsxwriter con constant_memory (opcional, el más rápido).
+- "csv":                 CSV UTF-8 con BOM, para quien lo acepte.
+- "parquet":             Parquet (opcional, necesita pyarrow), para procesos batch.
+
+Todos respetan el orden de columnas del template y el nombre de hoja pedido. Los backends
+en streaming dejan vacías las celdas sin cambio (en lugar de escribir ""). Los backends XLSX
+aceptan varias hojas en un mismo libro (`write_sheets`).
+"""
+import io
+import re
+import zipfile
+from typing import Dict, Iterable, List
+
+import pandas as pd
+
+try:  # Backend opcional
+    import xlsxwriter
+    HAS_XLSXWRITER = True
+except ImportError:
+    HAS_XLSXWRITER = False
+
+try:  # Backend opcional
+    import pyarrow  # noqa: F401
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+CSV_MEDIA_TYPE = "text/csv; charset=utf-8"
+ZIP_MEDIA_TYPE = "application/zip"
+PARQUET_MEDIA_TYPE = "application/vnd.apache.parquet"
+
+DEFAULT_BACKEND = "xlsxwriter" if HAS_XLSXWRITER else "openpyxl-write-only"
+
+
+def _rows(df: pd.DataFrame):
+    """Filas como listas Python, con "" y NaN como celda vacía."""
+    for row in df.itertuples(index=False, name=None):
+        yield [None if (v is None or v == "" or v != v) else v for v in row]
+
+
+# Cada backend recibe {nombre de hoja: df} (en orden) y devuelve el archivo en un BytesIO.
+def _write_openpyxl(sheets: Dict[str, pd.DataFrame]) -> io.BytesIO:
+    stream = io.BytesIO()
+    with pd.ExcelWriter(stream, engine="openpyxl") as writer:
+        for sheet_name, df in sheets.items():
+            df.to_excel(writer, index=False, sheet_name=sheet_name)
+    return stream
+
+
+def _write_openpyxl_write_only(sheets: Dict[str, pd.DataFrame]) -> io.BytesIO:
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Alignment, Border, Font, Side
+
+    wb = Workbook(write_only=True)
+    # Mismo estilo de encabezado que pandas (negrita, borde fino, centrado)
+    thin = Side(style="thin")
+    for sheet_name, df in sheets.items():
+        ws = wb.create_sheet(sheet_name)
+        header = []
+        for name in df.columns:
+            cell = WriteOnlyCell(ws, value=str(name))
+            cell.font = Font(bold=True)
+            cell.border = Border(left=thin, right=thin, top=thin, bottom=thin)
+            cell.alignment = Alignment(horizontal="center", vertical="top")
+            header.append(cell)
+        ws.append(header)
+        for row in _rows(df):
+            ws.append(row)
+    stream = io.BytesIO()
+    wb.save(stream)
+    return stream
+
+
+def _write_xlsxwriter(sheets: Dict[str, pd.DataFrame]) -> io.BytesIO:
+    stream = io.BytesIO()
+    wb = xlsxwriter.Workbook(stream, {"constant_memory": True, "in_memory": False})
+    header_format = wb.add_format({"bold": True, "border": 1, "align": "center", "valign": "top"})
+    for sheet_name, df in sheets.items():
+        ws = wb.add_worksheet(sheet_name)
+        ws.write_row(0, 0, [str(c) for c in df.columns], header_format)
+        for r, row in enumerate(_rows(df), start=1):
+            for c, value in enumerate(row):
+                if value is not None:
+                    ws.write(r, c, value)
+    wb.close()
+    return stream
+
+
+def _write_csv(sheets: Dict[str, pd.DataFrame]) -> io.BytesIO:
+    if len(sheets) != 1:
+        raise ValueError("CSV admite una sola hoja")
+    stream = io.BytesIO()
+    next(iter(sheets.values())).to_csv(stream, index=False, encoding="utf-8-sig")
+    return stream
+
+
+def _write_parquet(sheets: Dict[str, pd.DataFrame]) -> io.BytesIO:
+    if len(sheets) != 1:
+        raise ValueError("Parquet admite una sola hoja")
+    stream = io.BytesIO()
+    next(iter(sheets.values())).to_parquet(stream, index=False)
+    return stream
+
+
+BACKENDS = {
+    "openpyxl": _write_openpyxl,
+    "openpyxl-write-only": _write_openpyxl_write_only,
+    "xlsxwriter": _write_xlsxwriter,
+    "csv": _write_csv,
+    "parquet": _write_parquet,
+}
+_OPTIONAL = {"xlsxwriter": HAS_XLSXWRITER, "parquet": HAS_PYARROW}
+
+
+def available_backends() -> List[str]:
+    return [name for name in BACKENDS if _OPTIONAL.get(name, True)]
+
+
+def write_output(df: pd.DataFrame, sheet_name: str, backend: str = DEFAULT_BACKEND) -> io.BytesIO:
+    """Escribe `df` con el backend pedido y devuelve el stream posicionado al inicio."""
+    return write_sheets({sheet_name: df}, backend)
+
+
+def write_sheets(sheets: Dict[str, pd.DataFrame], backend: str = DEFAULT_BACKEND) -> io.BytesIO:
+    """Un libro con una hoja por entrada de `sheets` (en orden); ver `sheet_names`."""
+    if backend not in available_backends():
+        raise ValueError(f"Backend de escritura no disponible: {backend}")
+    stream = BACKENDS[backend](sheets)
+    stream.seek(0)
+    return stream
+
+
+def write_zip(files: Dict[str, io.BytesIO]) -> io.BytesIO:
+    """Zip con un archivo por entrada (nombre -> contenido)."""
+    stream = io.BytesIO()
+    with zipfile.ZipFile(stream, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, content in files.items():
+            zf.writestr(name, content.getbuffer())
+    stream.seek(0)
+    return stream
+
+
+def sheet_names(names: Iterable[str]) -> List[str]:
+    """Nombres válidos de hoja de Excel (sin []:*?/\\, hasta 31 caracteres, sin repetir)."""
+    out, seen = [], set()
+    for name in names:
+        base = re.sub(r"[\[\]:*?/\\]", "_", str(name)).strip("'")[:31] or "Hoja"
+        candidate, i = base, 1
+        while candidate.lower() in seen:
+            i += 1
+            suffix = f" ({i})"
+            candidate = base[:31 - len(suffix)] + suffix
+        seen.add(candidate.lower())
+        out.append(candidate)
+    return out
+
+
+def format_info(backend: str) -> Dict[str, str]:
+    """Extensión y media type del archivo que produce `backend`."""
+    if backend == "zip":
+        return {"extension": "zip", "media_type": ZIP_MEDIA_TYPE}
+    if backend == "csv":
+        return {"extension": "csv", "media_type": CSV_MEDIA_TYPE}
+    if backend == "parquet":
+        return {"extension": "parquet", "media_type": PARQUET_MEDIA_TYPE}
+    return {"extension": "xlsx", "media_type": XLSX_MEDIA_TYPE}